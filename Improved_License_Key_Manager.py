@@ -1,86 +1,94 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
 import json
 import uuid
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import argparse
 import base64
+import csv
+import itertools
+import getpass
 import os
 import hashlib
+import hmac
+import sqlite3
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import zlib
-import pyperclip
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
 from datetime import datetime
+from license_verifier import PUBLIC_KEY_FILE, encode_part, signing_input
 
-class LicenseManager:
-    def __init__(self):
-        self.window = tk.Tk()
-        self.window.title("Улучшенный Менеджер Лицензионных Ключей")
-        self.window.geometry("650x450")
-        
-        # Загрузка настроек темы
-        self.theme = self.load_theme_settings()
-        self.window.configure(bg=self.theme["background"])
-        
-        # Генерируем или загружаем ключи для шифрования
-        self.key_files = {
-            "secret.key": "secret.key",
-            "salt.dat": "salt.dat",
-            "rsa_private.pem": "rsa_private.pem",
-            "rsa_public.pem": "rsa_public.pem"
-        }
-        
-        self.keys = self.load_or_generate_keys()
-        self.create_interface()
-        self.license_keys = self.load_license_keys()
+# Tk нужен только для графического интерфейса; консольные команды работают и без него
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+except ImportError:
+    tk = None
 
-    def load_theme_settings(self):
-        """Загрузка настроек темы"""
-        themes = {
-            "light": {
-                "background": "#ffffff",
-                "text": "#000000",
-                "button": "#e0e0e0",
-                "frame": "#f0f0f0",
-                "highlight": "#007bff"
-            },
-            "dark": {
-                "background": "#2b2b2b",
-                "text": "#ffffff",
-                "button": "#404040",
-                "frame": "#3b3b3b",
-                "highlight": "#00ff00"
-            }
-        }
-        
-        if os.path.exists("theme.dat"):
-            try:
-                with open("theme.dat", "r") as f:
-                    return themes.get(json.load(f)["theme"], themes["light"])
-            except:
-                return themes["light"]
-        return themes["light"]
+# Файлы ключей и хранилища лицензий
+KEY_FILES = {
+    "secret.key": "secret.key",
+    "salt.dat": "salt.dat",
+    "rsa_private.pem": "rsa_private.pem",
+    "rsa_public.pem": "rsa_public.pem"
+}
+LICENSES_FILE = "licenses.dat"
+# Хранилище по записям (заменяет licenses.dat, который переносится при первом запуске)
+LICENSES_DB_FILE = "licenses.db"
+# Закрытый ключ Ed25519 для подписи токенов (открытый — license_verify.pem, для license_verifier)
+SIGNING_KEY_FILE = "license_signing.pem"
 
-    def save_theme_settings(self, theme_name):
-        """Сохранение настроек темы"""
-        with open("theme.dat", "w") as f:
-            json.dump({"theme": theme_name}, f)
-        self.theme = self.load_theme_settings()
-        self.update_theme()
+# Формат конверта: заголовок (сигнатура, версия, длина обернутого ключа), обернутый ключ данных,
+# nonce и шифртекст AES-GCM. Нулевой байт в сигнатуре не встречается в base64 прежнего формата
+ENVELOPE_MAGIC = b"LKM\x00"
+ENVELOPE_VERSION = 2
+ENVELOPE_HEADER = struct.Struct(">4sBH")
+ENVELOPE_NONCE_SIZE = 12
+# Уровень zlib: 1 сжимает список ключей почти так же, как 6, но в 2-3 раза быстрее
+COMPRESSION_LEVEL = 1
 
-    def update_theme(self):
-        """Обновление темы интерфейса"""
-        self.window.configure(bg=self.theme["background"])
-        for widget in self.window.winfo_children():
-            if isinstance(widget, ttk.Frame):
-                widget.configure(style=f'Custom.TFrame')
-            elif isinstance(widget, ttk.Button):
-                widget.configure(style=f'Custom.TButton')
-            elif isinstance(widget, ttk.Treeview):
-                widget.configure(style='Custom.Treeview')
+# Агент ключей: фоновый процесс текущего пользователя, который один раз выводит ключ PBKDF2 и
+# разбирает ключи RSA, а затем выполняет обертывание ключей данных для других запусков
+AGENT_DIR = os.path.join(tempfile.gettempdir(), f"license-agent-{getpass.getuser()}")
+AGENT_TOKEN_FILE = os.path.join(AGENT_DIR, "agent.token")
+# Время жизни агента по умолчанию (секунды), после него ключи снова выводятся из файлов
+AGENT_TTL = 3600
+# Сколько ждать готовности агента после запуска
+AGENT_START_TIMEOUT = 30
+
+# Параметры RSA-OAEP для обертывания данных
+def _oaep():
+    return padding.OAEP(
+        mgf=padding.MGF1(algorithm=hashes.SHA512()),
+        algorithm=hashes.SHA512(),
+        label=None
+    )
+
+class LicenseCrypto:
+    """Ключи и шифрование хранилища лицензий (без интерфейса)"""
+
+    def __init__(self, key_files=None, use_agent=True):
+        self.key_files = key_files or dict(KEY_FILES)
+        # Если запущен агент с теми же ключами, ключи из файлов не выводятся вовсе
+        self.agent = AgentClient.connect(self.key_files) if use_agent else None
+        self._keys = None if self.agent is not None else self.load_or_generate_keys()
+
+    @property
+    def keys(self):
+        if self._keys is None:
+            self._keys = self.load_or_generate_keys()
+        return self._keys
 
     def load_or_generate_keys(self):
         """Загрузка или создание всех необходимых ключей"""
@@ -155,30 +163,52 @@ class LicenseManager:
         
         return keys
 
-    def generate_license_key(self):
-        """Генерация нового лицензионного ключа"""
-        raw_uuid = str(uuid.uuid4()).replace('-', '')
-        formatted_key = f"{raw_uuid[:5]}-{raw_uuid[5:10]}-{raw_uuid[10:15]}-{raw_uuid[15:20]}-{raw_uuid[20:25]}-{raw_uuid[25:30]}-{raw_uuid[30:35]}-{raw_uuid[35:]}"
-        return formatted_key
+    def encrypt_data(self, data, envelope=True):
+        """Шифрование данных: конверт (по умолчанию) или прежний многоуровневый формат"""
+        if isinstance(data, str):
+            data = data.encode()
+        if not envelope:
+            return self._encrypt_legacy(data)
+
+        # Случайный ключ данных шифрует сами данные (AES-GCM, размер не ограничен),
+        # а RSA оборачивает только этот ключ, предварительно зашифрованный Fernet
+        data_key = AESGCM.generate_key(bit_length=256)
+        wrapped_key = self.wrap(data_key)
+        nonce = os.urandom(ENVELOPE_NONCE_SIZE)
+        header = ENVELOPE_HEADER.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, len(wrapped_key)) + wrapped_key + nonce
+        # Заголовок аутентифицируется вместе с шифртекстом
+        return header + AESGCM(data_key).encrypt(nonce, data, header)
 
-    def encrypt_data(self, data):
-        """Многоуровневое шифрование данных"""
+    def decrypt_data(self, encrypted_data):
+        """Расшифровка данных: bytes для конверта, str для прежнего формата"""
+        if isinstance(encrypted_data, bytes) and encrypted_data.startswith(ENVELOPE_MAGIC):
+            return self._decrypt_envelope(encrypted_data)
+        if isinstance(encrypted_data, bytes):
+            encrypted_data = encrypted_data.decode("ascii")
+        return self._decrypt_legacy(encrypted_data)
+
+    def _decrypt_envelope(self, encrypted_data):
+        if len(encrypted_data) < ENVELOPE_HEADER.size:
+            raise ValueError("Данные были повреждены или подделаны")
+        _, version, wrapped_size = ENVELOPE_HEADER.unpack_from(encrypted_data)
+        if version != ENVELOPE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия формата: {version}")
+        start = ENVELOPE_HEADER.size
+        wrapped_key = encrypted_data[start:start + wrapped_size]
+        header_size = start + wrapped_size + ENVELOPE_NONCE_SIZE
+        if len(wrapped_key) != wrapped_size or len(encrypted_data) < header_size:
+            raise ValueError("Данные были повреждены или подделаны")
+        nonce = encrypted_data[start + wrapped_size:header_size]
+        data_key = self.unwrap(wrapped_key)
+        return AESGCM(data_key).decrypt(nonce, encrypted_data[header_size:], encrypted_data[:header_size])
+
+    def _encrypt_legacy(self, data):
+        # Прежний формат: вся строка целиком проходит через RSA, поэтому не более ~380 байт
         # Первый уровень: SHA-512 хеширование
-        sha512_hash = hashlib.sha512(data.encode()).digest()
+        sha512_hash = hashlib.sha512(data).digest()
         
-        # Второй уровень: AES шифрование через Fernet
-        cipher_suite = Fernet(self.keys["fernet_key"])
-        encrypted_data = cipher_suite.encrypt(data.encode())
-        
-        # Третий уровень: RSA шифрование
-        encrypted_data = self.keys["rsa_public"].encrypt(
-            encrypted_data,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA512()),
-                algorithm=hashes.SHA512(),
-                label=None
-            )
-        )
+        # Второй и третий уровни: AES шифрование через Fernet, затем RSA
+        encrypted_data = self.wrap(data)
         
         # Четвертый уровень: SHA-512 хеширование результата
         final_hash = hashlib.sha512(encrypted_data).digest()
@@ -186,64 +216,578 @@ class LicenseManager:
         # Объединение всех данных
         return base64.b64encode(encrypted_data + final_hash).decode()
 
-    def decrypt_data(self, encrypted_data):
-        """Расшифровка данных"""
+    def _decrypt_legacy(self, encrypted_data):
+        # Раскодирование Base64
+        combined = base64.b64decode(encrypted_data.encode())
+        
+        # Разделение данных и хеша
+        encrypted_data = combined[:-64]
+        stored_hash = combined[-64:]
+        
+        # Проверка целостности данных
+        current_hash = hashlib.sha512(encrypted_data).digest()
+        if stored_hash != current_hash:
+            raise ValueError("Данные были повреждены или подделаны")
+        
+        # RSA и Fernet расшифровка
+        return self.unwrap(encrypted_data).decode()
+
+    def wrap(self, data):
+        """Fernet, затем RSA-OAEP (не более ~380 байт данных)"""
+        if self.agent is not None:
+            try:
+                return self.agent.call("wrap", data)
+            except (OSError, EOFError, AuthenticationError):
+                self.agent = None  # Агент завершился — дальше работаем с ключами из файлов
+        return self.keys["rsa_public"].encrypt(Fernet(self.keys["fernet_key"]).encrypt(data), _oaep())
+
+    def unwrap(self, data):
+        """Обратное к wrap"""
+        if self.agent is not None:
+            try:
+                return self.agent.call("unwrap", data)
+            except (OSError, EOFError, AuthenticationError):
+                self.agent = None
+        return Fernet(self.keys["fernet_key"]).decrypt(self.keys["rsa_private"].decrypt(data, _oaep()))
+
+    def save(self, license_keys, path=LICENSES_FILE):
+        """Сохранение списка ключей: сжатие, конверт и атомарная замена файла"""
+        compressed_data = zlib.compress(json.dumps(license_keys, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+        encrypted_data = self.encrypt_data(compressed_data)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encrypted_data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load(self, path=LICENSES_FILE):
+        """Загрузка списка ключей (конверт или прежний формат)"""
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            decrypted_data = self.decrypt_data(f.read())
+        if isinstance(decrypted_data, str):
+            # Прежний формат хранил сжатые данные строкой
+            decrypted_data = decrypted_data.encode()
+        return json.loads(zlib.decompress(decrypted_data))
+
+LICENSE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS licenses ("
+    "id INTEGER PRIMARY KEY, lookup BLOB NOT NULL UNIQUE, payload BLOB NOT NULL, revoked INTEGER NOT NULL DEFAULT 0)",
+]
+
+class LicenseStore:
+    """Хранилище лицензий по записям (SQLite): каждая запись шифруется отдельно,
+    поиск, отзыв и удаление — по индексу HMAC ключа, без перезаписи остальных записей"""
+
+    LOOKUP_SIZE = 16
+    NONCE_SIZE = 12
+
+    def __init__(self, crypto, path=LICENSES_DB_FILE):
+        self.crypto = crypto
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in LICENSE_SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
         try:
-            # Раскодирование Base64
-            combined = base64.b64decode(encrypted_data.encode())
-            
-            # Разделение данных и хеша
-            encrypted_data = combined[:-64]
-            stored_hash = combined[-64:]
-            
-            # Проверка целостности данных
-            current_hash = hashlib.sha512(encrypted_data).digest()
-            if stored_hash != current_hash:
-                raise ValueError("Данные были повреждены или подделаны")
-            
-            # RSA расшифровка
-            decrypted_data = self.keys["rsa_private"].decrypt(
-                encrypted_data,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA512()),
-                    algorithm=hashes.SHA512(),
-                    label=None
+            data_key = self._load_data_key()
+        except Exception:
+            self._db.close()
+            raise
+        self._aead = AESGCM(data_key)
+        # HMAC с уже подготовленным ключом: для каждого ключа копируется, а не создается заново
+        self._index_hmac = hmac.new(hmac.new(data_key, b"license-index", hashlib.sha256).digest(), digestmod=hashlib.sha256)
+
+    def _load_data_key(self):
+        # Ключ данных хранилища обернут, как в конверте (Fernet, затем RSA), и
+        # разворачивается один раз при открытии
+        query = "SELECT value FROM meta WHERE name = 'data_key'"
+        row = self._db.execute(query).fetchone()
+        if row is None:
+            # Если хранилище одновременно создает другой процесс, остается ключ, записанный первым
+            with self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO meta (name, value) VALUES ('data_key', ?)",
+                    (self.crypto.wrap(AESGCM.generate_key(bit_length=256)),)
                 )
-            )
-            
-            # Fernet расшифровка
-            cipher_suite = Fernet(self.keys["fernet_key"])
-            decrypted_data = cipher_suite.decrypt(decrypted_data)
-            
-            return decrypted_data.decode()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось расшифровать данные: {str(e)}")
+            row = self._db.execute(query).fetchone()
+        return self.crypto.unwrap(row[0])
+
+    def lookup(self, key):
+        """Значение индекса для ключа (сам ключ в открытом виде не хранится)"""
+        digest = self._index_hmac.copy()
+        digest.update(key.strip().lower().encode())
+        return digest.digest()[:self.LOOKUP_SIZE]
+
+    def _seal_many(self, records):
+        # Строки (индекс, nonce + шифртекст); nonce для всей пачки берутся одним вызовом os.urandom.
+        # Индекс входит в аутентифицированные данные: запись нельзя переставить к другому ключу
+        size = self.NONCE_SIZE
+        nonces = os.urandom(size * len(records))
+        encode = _compact_json.encode
+        encrypt = self._aead.encrypt
+        rows = []
+        for start, record in zip(range(0, len(nonces), size), records):
+            lookup = self.lookup(record["key"])
+            nonce = nonces[start:start + size]
+            rows.append((lookup, nonce + encrypt(nonce, encode(record).encode(), lookup)))
+        return rows
+
+    def _open(self, lookup, payload, revoked):
+        record = json.loads(self._aead.decrypt(payload[:self.NONCE_SIZE], payload[self.NONCE_SIZE:], lookup))
+        record["revoked"] = bool(revoked)
+        return record
+
+    def add(self, record):
+        """Добавление записи {"key": ..., ...}; возвращает ее id"""
+        return self.add_many([record])[0]
+
+    def add_many(self, records):
+        """Добавление записей одной транзакцией; при повторе ключа не добавляется ни одна"""
+        rows = self._seal_many(list(records))
+        try:
+            with self._lock, self._db:
+                return [
+                    self._db.execute("INSERT INTO licenses (lookup, payload) VALUES (?, ?)", row).lastrowid
+                    for row in rows
+                ]
+        except sqlite3.IntegrityError:
+            raise ValueError("Такой ключ уже есть в хранилище")
+
+    def add_batches(self, batches):
+        """Добавление пачек записей (например, из генератора) одной транзакцией; возвращает
+        число записей. В памяти — одна пачка; при повторе ключа не добавляется ни одна"""
+        count = 0
+        try:
+            with self._lock, self._db:
+                for records in batches:
+                    self._db.executemany("INSERT INTO licenses (lookup, payload) VALUES (?, ?)", self._seal_many(records))
+                    count += len(records)
+        except sqlite3.IntegrityError:
+            raise ValueError("Такой ключ уже есть в хранилище")
+        return count
+
+    def get(self, key):
+        """Запись по ключу (с полем revoked) или None"""
+        lookup = self.lookup(key)
+        with self._lock:
+            row = self._db.execute("SELECT payload, revoked FROM licenses WHERE lookup = ?", (lookup,)).fetchone()
+        return None if row is None else self._open(lookup, *row)
+
+    def revoke(self, key):
+        """Отзыв ключа (запись остается); False, если ключа нет"""
+        with self._lock, self._db:
+            return self._db.execute("UPDATE licenses SET revoked = 1 WHERE lookup = ?", (self.lookup(key),)).rowcount > 0
+
+    def delete(self, key):
+        """Удаление записи; False, если ключа нет"""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM licenses WHERE lookup = ?", (self.lookup(key),)).rowcount > 0
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM licenses").fetchone()[0]
+
+    def records(self, batch_size=1000):
+        """Все записи [(id, запись)] в порядке добавления, пачками по batch_size"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, lookup, payload, revoked FROM licenses WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for entry_id, lookup, payload, revoked in rows:
+                yield entry_id, self._open(lookup, payload, revoked)
+            last_id = rows[-1][0]
+
+    def import_legacy(self, path=LICENSES_FILE):
+        """Однократный перенос списка из licenses.dat; файл переименовывается в .migrated"""
+        if not os.path.exists(path):
+            return 0
+        records = self.crypto.load(path)
+        self.add_many(records)
+        os.replace(path, path + ".migrated")
+        return len(records)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# Размер пачки при массовом выпуске ключей
+ISSUE_BATCH_SIZE = 10000
+_compact_json = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+def format_license_key(raw):
+    """Ключ в формате приложения из 32 шестнадцатеричных символов"""
+    return f"{raw[:5]}-{raw[5:10]}-{raw[10:15]}-{raw[15:20]}-{raw[20:25]}-{raw[25:30]}-{raw[30:35]}-{raw[35:]}"
+
+def generate_license_keys(count):
+    """Пакетная генерация ключей: 128 случайных бит на ключ из одного вызова os.urandom"""
+    raw = os.urandom(16 * count).hex()
+    return [format_license_key(raw[start:start + 32]) for start in range(0, 32 * count, 32)]
+
+def issue_licenses(store, rows, batch_size=ISSUE_BATCH_SIZE, export=None):
+    """Массовый выпуск: по ключу на каждую строку метаданных (dict), все записи — одной
+    транзакцией. export(записи) вызывается для каждой пачки; возвращает число ключей.
+    Поля key и date заполняются при выпуске — строка с ними отклоняется (ValueError)"""
+    date_created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = iter(rows)
+
+    def batches():
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk:
+                return
+            for row in chunk:
+                reserved = [name for name in ("key", "date") if name in row]
+                if reserved:
+                    raise ValueError(f"Поля {', '.join(reserved)} заполняются при выпуске, уберите их из данных: {row}")
+            records = [
+                dict(row, key=key, date=date_created)
+                for row, key in zip(chunk, generate_license_keys(len(chunk)))
+            ]
+            if export is not None:
+                export(records)
+            yield records
+
+    return store.add_batches(batches())
+
+class LicenseSigner:
+    """Подпись лицензий ключом Ed25519: токен проверяется license_verifier без хранилища"""
+
+    def __init__(self, private_key_file=SIGNING_KEY_FILE, public_key_file=PUBLIC_KEY_FILE):
+        generated = not os.path.exists(private_key_file)
+        if generated:
+            self.private_key = Ed25519PrivateKey.generate()
+            # Ключ подписи доступен только владельцу
+            fd = os.open(private_key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.private_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                ))
+        else:
+            with open(private_key_file, "rb") as key_file:
+                self.private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+        public_key = self.private_key.public_key()
+        if generated or not os.path.exists(public_key_file):
+            # Открытый ключ от прежней пары не подошел бы к новому ключу подписи — он перезаписывается
+            with open(public_key_file, "wb") as f:
+                f.write(public_key.public_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PublicFormat.SubjectPublicKeyInfo
+                ))
+        else:
+            with open(public_key_file, "rb") as f:
+                stored_key = serialization.load_pem_public_key(f.read())
+            raw = (serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+            if stored_key.public_bytes(*raw) != public_key.public_bytes(*raw):
+                raise ValueError(f"{public_key_file} не соответствует ключу подписи {private_key_file}")
+
+    def sign(self, record):
+        """Токен для записи лицензии (поле revoked в токен не входит)"""
+        payload = {name: value for name, value in record.items() if name not in ("revoked", "token")}
+        payload_part = encode_part(json.dumps(payload, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode())
+        data = signing_input(payload_part)
+        return f"{data.decode('ascii')}.{encode_part(self.private_key.sign(data))}"
+
+class LicenseExporter:
+    """Запись выпущенных ключей в CSV (столбцы — по первой пачке) или JSON Lines;
+    с signer к каждой записи добавляется подписанный токен. Запись CSV с полем,
+    которого нет в заголовке, отклоняется (ValueError), а не теряется молча"""
+
+    def __init__(self, file, fmt="csv", signer=None):
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError(f"Неизвестный формат: {fmt}")
+        self.file = file
+        self.fmt = fmt
+        self.signer = signer
+        self._writer = None
+
+    def __call__(self, records):
+        if self.signer is not None:
+            # Токен только в выгрузке: в хранилище он не нужен, его всегда можно выпустить заново
+            records = [dict(record, token=self.signer.sign(record)) for record in records]
+        if self.fmt == "jsonl":
+            encode = _compact_json.encode
+            self.file.write("".join(encode(record) + "\n" for record in records))
+            return
+        if self._writer is None and records:
+            fieldnames = ["key", "date"] + [name for name in records[0] if name not in ("key", "date")]
+            self._writer = csv.DictWriter(self.file, fieldnames, lineterminator="\n")
+            self._writer.writeheader()
+        fieldnames = set(self._writer.fieldnames)
+        for record in records:
+            extra = [name for name in record if name not in fieldnames]
+            if extra:
+                raise ValueError(f"Поля {', '.join(map(str, extra))} нет в первой строке, CSV их не сохранит; "
+                                 f"выгрузите в JSON Lines или добавьте поле во все строки")
+        self._writer.writerows(records)
+
+def read_license_rows(source, fmt="csv"):
+    """Строки метаданных из CSV (с заголовком) или JSON Lines (объект в строке)"""
+    if fmt == "csv":
+        yield from csv.DictReader(source)
+        return
+    for line_number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if not isinstance(row, dict):
+            raise ValueError(f"Строка {line_number}: ожидается объект JSON")
+        yield row
+
+def key_files_id(key_files):
+    """Отпечаток набора ключей (по содержимому файлов, без вывода ключа)"""
+    digest = hashlib.sha256()
+    for name in sorted(key_files):
+        with open(key_files[name], "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def agent_dir_trusted():
+    """Папка агента принадлежит текущему пользователю и закрыта для остальных"""
+    if sys.platform == "win32":
+        return True  # Временная папка в Windows и так своя у каждого пользователя
+    info = os.stat(AGENT_DIR)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+def agent_address():
+    """Адрес агента: именованный канал в Windows, сокет Unix в остальных системах"""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\license-agent-{getpass.getuser()}", "AF_PIPE"
+    return os.path.join(AGENT_DIR, "agent.sock"), "AF_UNIX"
+
+class AgentClient:
+    """Подключение к агенту ключей"""
+
+    def __init__(self, key_id, authkey):
+        self.key_id = key_id
+        self.authkey = authkey
+
+    @classmethod
+    def connect(cls, key_files):
+        """Клиент, если агент запущен и обслуживает те же ключи, иначе None"""
+        try:
+            if not os.path.exists(AGENT_TOKEN_FILE) or not agent_dir_trusted():
+                return None
+            with open(AGENT_TOKEN_FILE, "rb") as f:
+                client = cls(key_files_id(key_files), f.read())
+            return client if client.call("status")["key_id"] == client.key_id else None
+        except (OSError, EOFError, ValueError, KeyError, AuthenticationError):
             return None
 
-    def save_license_keys(self):
-        """Сохранение ключей в зашифрованном виде с сжатием"""
-        # Сжатие данных
-        compressed_data = zlib.compress(json.dumps(self.license_keys).encode())
+    def call(self, op, data=None):
+        # Сообщения — JSON (не pickle); соединение проверяется по общему секрету из файла токена
+        address, family = agent_address()
+        with Client(address, family=family, authkey=self.authkey) as conn:
+            request = {"op": op, "key_id": self.key_id}
+            if data is not None:
+                request["data"] = base64.b64encode(data).decode()
+            conn.send_bytes(json.dumps(request).encode())
+            response = json.loads(conn.recv_bytes())
+        if not response.get("ok"):
+            raise ValueError(response.get("error", "Ошибка агента ключей"))
+        if "data" in response:
+            return base64.b64decode(response["data"])
+        return response
+
+class KeyAgent:
+    """Агент ключей: держит выведенный ключ и разобранные ключи RSA до истечения TTL"""
+
+    def __init__(self, key_files=None, ttl=AGENT_TTL):
+        self.crypto = LicenseCrypto(key_files, use_agent=False)
+        self.key_id = key_files_id(self.crypto.key_files)
+        self.ttl = ttl
+        self.expires = time.time() + ttl
+
+    def serve(self):
+        """Обслуживание запросов до истечения TTL или команды stop"""
+        os.makedirs(AGENT_DIR, mode=0o700, exist_ok=True)
+        if not agent_dir_trusted():
+            raise PermissionError(f"Папка агента доступна другим пользователям: {AGENT_DIR}")
+        authkey = os.urandom(32)
+        address, family = agent_address()
+        if family == "AF_UNIX" and os.path.exists(address):
+            os.remove(address)
+        listener = Listener(address, family=family, authkey=authkey)
+        # Токен доступен только владельцу; он появляется последним и означает готовность агента
+        fd = os.open(AGENT_TOKEN_FILE + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(authkey)
+        os.replace(AGENT_TOKEN_FILE + ".tmp", AGENT_TOKEN_FILE)
+        timer = threading.Timer(self.ttl, self.shutdown, args=(listener,))
+        timer.daemon = True
+        timer.start()
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue  # Оборванное соединение или неверный токен у клиента
+            with conn:
+                try:
+                    response = self.handle(json.loads(conn.recv_bytes()))
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                conn.send_bytes(json.dumps(response).encode())
+            if response.get("stopped"):
+                self.shutdown(listener)
+
+    def handle(self, request):
+        op = request.get("op")
+        if op == "status":
+            return {"ok": True, "key_id": self.key_id, "expires": self.expires}
+        if op == "stop":
+            return {"ok": True, "stopped": True}
+        if request.get("key_id") != self.key_id:
+            return {"ok": False, "error": "Агент обслуживает другие ключи"}
+        if op not in ("wrap", "unwrap"):
+            return {"ok": False, "error": f"Неизвестная операция: {op}"}
+        data = base64.b64decode(request["data"])
+        result = self.crypto.wrap(data) if op == "wrap" else self.crypto.unwrap(data)
+        return {"ok": True, "data": base64.b64encode(result).decode()}
+
+    def shutdown(self, listener):
+        # Вызывается и из таймера, поэтому процесс завершается сразу, не дожидаясь accept
+        for path in (AGENT_TOKEN_FILE, agent_address()[0]):
+            if os.path.exists(path) and path.startswith(AGENT_DIR):
+                os.remove(path)
+        os._exit(0)
+
+def start_agent(ttl=AGENT_TTL):
+    """Запуск агента в отдельном процессе; возвращает его состояние"""
+    stop_agent()
+    flags = {"creationflags": subprocess.DETACHED_PROCESS} if sys.platform == "win32" else {"start_new_session": True}
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "agent", "serve", "--ttl", str(ttl)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **flags
+    )
+    deadline = time.time() + AGENT_START_TIMEOUT
+    while time.time() < deadline:
+        status = agent_status()
+        if status is not None:
+            return status
+        time.sleep(0.05)
+    raise RuntimeError("Агент ключей не запустился")
+
+def agent_status():
+    """Состояние агента или None, если он не запущен"""
+    try:
+        if not os.path.exists(AGENT_TOKEN_FILE) or not agent_dir_trusted():
+            return None
+        with open(AGENT_TOKEN_FILE, "rb") as f:
+            return AgentClient(None, f.read()).call("status")
+    except (OSError, EOFError, ValueError, AuthenticationError):
+        return None
+
+def stop_agent():
+    """Остановка агента (ключи удаляются из памяти вместе с процессом)"""
+    if agent_status() is None:
+        return False
+    with open(AGENT_TOKEN_FILE, "rb") as f:
+        AgentClient(None, f.read()).call("stop")
+    return True
+
+class LicenseManager:
+    def __init__(self):
+        self.window = tk.Tk()
+        self.window.title("Улучшенный Менеджер Лицензионных Ключей")
+        self.window.geometry("650x450")
         
-        # Шифрование сжатых данных
-        encrypted_data = self.encrypt_data(compressed_data.decode())
+        # Загрузка настроек темы
+        self.theme = self.load_theme_settings()
+        self.window.configure(bg=self.theme["background"])
         
-        with open("licenses.dat", "w") as f:
-            f.write(encrypted_data)
+        # Генерируем или загружаем ключи для шифрования
+        self.key_files = dict(KEY_FILES)
+        self.crypto = LicenseCrypto(self.key_files)
+        self.create_interface()
+        self.store = self.open_license_store()
 
-    def load_license_keys(self):
-        """Загрузка сохраненных ключей"""
-        if os.path.exists("licenses.dat"):
+    def load_theme_settings(self):
+        """Загрузка настроек темы"""
+        themes = {
+            "light": {
+                "background": "#ffffff",
+                "text": "#000000",
+                "button": "#e0e0e0",
+                "frame": "#f0f0f0",
+                "highlight": "#007bff"
+            },
+            "dark": {
+                "background": "#2b2b2b",
+                "text": "#ffffff",
+                "button": "#404040",
+                "frame": "#3b3b3b",
+                "highlight": "#00ff00"
+            }
+        }
+        
+        if os.path.exists("theme.dat"):
             try:
-                with open("licenses.dat", "r") as f:
-                    encrypted_data = f.read()
-                    decrypted_data = self.decrypt_data(encrypted_data)
-                    decompressed_data = zlib.decompress(decrypted_data.encode())
-                    return json.loads(decompressed_data)
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось загрузить ключи: {str(e)}")
-                return []
-        return []
+                with open("theme.dat", "r") as f:
+                    return themes.get(json.load(f)["theme"], themes["light"])
+            except:
+                return themes["light"]
+        return themes["light"]
+
+    def save_theme_settings(self, theme_name):
+        """Сохранение настроек темы"""
+        with open("theme.dat", "w") as f:
+            json.dump({"theme": theme_name}, f)
+        self.theme = self.load_theme_settings()
+        self.update_theme()
+
+    def update_theme(self):
+        """Обновление темы интерфейса"""
+        self.window.configure(bg=self.theme["background"])
+        for widget in self.window.winfo_children():
+            if isinstance(widget, ttk.Frame):
+                widget.configure(style=f'Custom.TFrame')
+            elif isinstance(widget, ttk.Button):
+                widget.configure(style=f'Custom.TButton')
+            elif isinstance(widget, ttk.Treeview):
+                widget.configure(style='Custom.Treeview')
+
+    @property
+    def keys(self):
+        """Ключи из файлов (при запущенном агенте выводятся только по запросу)"""
+        return self.crypto.keys
+
+    def generate_license_key(self):
+        """Генерация нового лицензионного ключа"""
+        raw_uuid = str(uuid.uuid4()).replace('-', '')
+        return format_license_key(raw_uuid)
+
+    def encrypt_data(self, data, envelope=True):
+        """Шифрование данных (см. LicenseCrypto.encrypt_data)"""
+        return self.crypto.encrypt_data(data, envelope)
+
+    def decrypt_data(self, encrypted_data):
+        """Расшифровка данных"""
+        try:
+            return self.crypto.decrypt_data(encrypted_data)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось расшифровать данные: {str(e)}")
+            return None
+
+    def open_license_store(self):
+        """Открытие хранилища с переносом прежнего licenses.dat"""
+        store = LicenseStore(self.crypto)
+        try:
+            store.import_legacy()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить ключи: {str(e)}")
+        return store
 
     def create_interface(self):
         """Создание интерфейса"""
@@ -293,7 +837,8 @@ class LicenseManager:
             messagebox.showwarning("Внимание", "Выберите ключ для копирования")
             return
         
-        key = self.license_keys[self.tree.index(selected_item[0])]["key"]
+        key = self.tree.set(selected_item[0], "Ключ")
+        import pyperclip
         pyperclip.copy(key)
         messagebox.showinfo("Успех", "Ключ скопирован в буфер обмена")
 
@@ -308,10 +853,9 @@ class LicenseManager:
         license_key = self.generate_license_key()
         date_created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        self.license_keys.append({"key": license_key, "date": date_created})
-        self.save_license_keys()
-        
-        self.update_tree_view()
+        # Записывается и добавляется в список только новая запись
+        entry_id = self.store.add({"key": license_key, "date": date_created})
+        self.tree.insert("", "end", iid=str(entry_id), values=(license_key, date_created))
         messagebox.showinfo("Успех", f"Сгенерирован новый ключ: {license_key}")
 
     def delete_selected_key(self):
@@ -321,22 +865,153 @@ class LicenseManager:
             messagebox.showwarning("Внимание", "Выберите ключ для удаления")
             return
         
-        item_index = self.tree.index(selected_item[0])
-        del self.license_keys[item_index]
-        self.save_license_keys()
-        self.update_tree_view()
+        self.store.delete(self.tree.set(selected_item[0], "Ключ"))
+        self.tree.delete(selected_item[0])
 
     def update_tree_view(self):
         """Обновление отображаемого списка ключей"""
         self.tree.delete(*self.tree.get_children())
-        for item in self.license_keys:
-            self.tree.insert("", "end", values=(item["key"], item["date"]))
+        try:
+            for entry_id, item in self.store.records():
+                self.tree.insert("", "end", iid=str(entry_id), values=(item["key"], item["date"]))
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить ключи: {str(e)}")
 
     def run(self):
         """Запуск приложения"""
         self.update_tree_view()
         self.window.mainloop()
 
+def run_agent(args):
+    if args.action == "serve":
+        KeyAgent(ttl=args.ttl).serve()
+    elif args.action == "start":
+        status = start_agent(args.ttl)
+        print(f"Агент запущен до {datetime.fromtimestamp(status['expires']):%H:%M:%S}")
+    elif args.action == "stop":
+        print("Агент остановлен" if stop_agent() else "Агент не запущен")
+    else:
+        status = agent_status()
+        if status is None:
+            print("Агент не запущен")
+            return 1
+        print(f"Агент запущен до {datetime.fromtimestamp(status['expires']):%H:%M:%S}")
+    return 0
+
+def data_format(path, default="csv"):
+    """Формат файла по расширению"""
+    return "jsonl" if path and path.lower().endswith((".jsonl", ".json")) else default
+
+def run_issue(args):
+    metadata = {}
+    for field in args.field:
+        name, sep, value = field.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Поле задается как имя=значение: {field}")
+        metadata[name] = value
+    if args.input is None and args.count is None:
+        raise ValueError("Укажите --count или --input")
+
+    fmt = args.format or data_format(args.output)
+    # Выгрузка появляется только после сохранения транзакции: файл — через временный рядом с ним,
+    # stdout — через временный файл, который копируется в stdout после сохранения
+    tmp_path = args.output + ".tmp" if args.output else None
+    # Хранилище открывается первым: если его не удалось открыть, выгрузка не создается
+    store = LicenseStore(LicenseCrypto(), args.db)
+    source = output = None
+    try:
+        signer = LicenseSigner() if args.sign else None
+        if args.input is not None:
+            source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+            rows = (dict(metadata, **row) for row in read_license_rows(source, data_format(args.input)))
+        else:
+            rows = itertools.repeat(metadata, args.count)
+        if tmp_path:
+            output = open(tmp_path, "w", newline="", encoding="utf-8")
+        else:
+            output = tempfile.TemporaryFile("w+", newline="", encoding="utf-8")
+        start = time.perf_counter()
+        count = issue_licenses(store, rows, export=LicenseExporter(output, fmt, signer))
+        elapsed = time.perf_counter() - start
+    except Exception:
+        if output is not None:
+            output.close()
+            if tmp_path:
+                os.remove(tmp_path)
+        raise
+    finally:
+        store.close()
+        if source not in (None, sys.stdin):
+            source.close()
+    if tmp_path:
+        output.close()
+        os.replace(tmp_path, args.output)
+    else:
+        output.seek(0)
+        sys.stdout.writelines(output)
+        output.close()
+    print(f"Выпущено ключей: {count} за {elapsed:.2f} с", file=sys.stderr)
+    return 0
+
+def run_sign(args):
+    store = LicenseStore(LicenseCrypto(), args.db)
+    try:
+        record = store.get(args.key)
+    finally:
+        store.close()
+    if record is None:
+        raise ValueError(f"Ключ не найден: {args.key}")
+    if record["revoked"]:
+        raise ValueError(f"Ключ отозван: {args.key}")
+    print(LicenseSigner().sign(record))
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Improved_License_Key_Manager",
+        description="Менеджер лицензионных ключей. Без аргументов запускается окно приложения.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    agent = commands.add_parser("agent", help="агент ключей: ключи выводятся один раз на сессию")
+    agent.add_argument("action", choices=["start", "stop", "status", "serve"],
+                       help="start — запустить в фоне, serve — работать в текущем процессе")
+    agent.add_argument("--ttl", type=int, default=AGENT_TTL, help=f"время жизни в секундах (по умолчанию {AGENT_TTL})")
+
+    issue = commands.add_parser("issue", help="массовый выпуск ключей одной транзакцией")
+    issue.add_argument("--count", type=int, help="сколько ключей выпустить (с одинаковыми полями --field)")
+    issue.add_argument("--input", help="CSV или JSONL с метаданными клиентов, по ключу на строку ('-' — CSV из stdin)")
+    issue.add_argument("--field", action="append", default=[], metavar="ИМЯ=ЗНАЧЕНИЕ",
+                       help="поле метаданных для всех ключей (можно повторять)")
+    issue.add_argument("-o", "--output", help="файл выгрузки (по умолчанию stdout)")
+    issue.add_argument("--format", choices=["csv", "jsonl"], help="формат выгрузки (по умолчанию по расширению, иначе csv)")
+    issue.add_argument("--db", default=LICENSES_DB_FILE, help=f"хранилище ключей (по умолчанию {LICENSES_DB_FILE})")
+    issue.add_argument("--sign", action="store_true", help=f"добавить подписанный токен (проверяется по {PUBLIC_KEY_FILE})")
+
+    sign = commands.add_parser("sign", help="подписанный токен для выданного ключа")
+    sign.add_argument("key", help="лицензионный ключ")
+    sign.add_argument("--db", default=LICENSES_DB_FILE, help=f"хранилище ключей (по умолчанию {LICENSES_DB_FILE})")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "agent":
+            return run_agent(args)
+        if args.command == "issue":
+            return run_issue(args)
+        if args.command == "sign":
+            return run_sign(args)
+    except InvalidToken:
+        # Ключ данных хранилища обернут другим secret.key
+        print("Ошибка: не удалось расшифровать хранилище текущим secret.key", file=sys.stderr)
+        return 1
+    except (ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     app = LicenseManager()
     app.run()
\ No newline at end of file
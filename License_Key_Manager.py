@@ -4,7 +4,112 @@ import json
 import uuid
 from cryptography.fernet import Fernet
 import base64
+import hashlib
+import hmac
 import os
+import sqlite3
+import threading
+
+LICENSES_FILE = "licenses.dat"
+# Хранилище по записям (заменяет licenses.dat, который переносится при первом запуске).
+# Имя отличается от базы Improved_License_Key_Manager: форматы записей у менеджеров несовместимы
+LICENSES_DB_FILE = "simple_licenses.db"
+
+LICENSE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS licenses ("
+    "id INTEGER PRIMARY KEY, lookup BLOB NOT NULL UNIQUE, payload BLOB NOT NULL, revoked INTEGER NOT NULL DEFAULT 0)",
+]
+
+class LicenseStore:
+    """Хранилище лицензий по записям (SQLite): каждая запись — отдельный токен Fernet,
+    поиск, отзыв и удаление — по индексу HMAC ключа"""
+
+    LOOKUP_SIZE = 16
+
+    def __init__(self, key, path=LICENSES_DB_FILE):
+        self.fernet = Fernet(key)
+        self.path = path
+        self._index_key = hmac.new(key, b"license-index", hashlib.sha256).digest()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in LICENSE_SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    def lookup(self, key):
+        """Значение индекса для ключа (сам ключ в открытом виде не хранится)"""
+        return hmac.new(self._index_key, key.strip().lower().encode(), hashlib.sha256).digest()[:self.LOOKUP_SIZE]
+
+    def _open(self, payload, revoked):
+        record = json.loads(self.fernet.decrypt(payload))
+        record["revoked"] = bool(revoked)
+        return record
+
+    def add(self, record):
+        """Добавление записи {"key": ..., ...}; возвращает ее id"""
+        return self.add_many([record])[0]
+
+    def add_many(self, records):
+        """Добавление записей одной транзакцией; при повторе ключа не добавляется ни одна"""
+        rows = [(self.lookup(record["key"]), self.fernet.encrypt(json.dumps(record).encode())) for record in records]
+        try:
+            with self._lock, self._db:
+                return [
+                    self._db.execute("INSERT INTO licenses (lookup, payload) VALUES (?, ?)", row).lastrowid
+                    for row in rows
+                ]
+        except sqlite3.IntegrityError:
+            raise ValueError("Такой ключ уже есть в хранилище")
+
+    def get(self, key):
+        """Запись по ключу (с полем revoked) или None"""
+        with self._lock:
+            row = self._db.execute("SELECT payload, revoked FROM licenses WHERE lookup = ?", (self.lookup(key),)).fetchone()
+        return None if row is None else self._open(*row)
+
+    def revoke(self, key):
+        """Отзыв ключа (запись остается); False, если ключа нет"""
+        with self._lock, self._db:
+            return self._db.execute("UPDATE licenses SET revoked = 1 WHERE lookup = ?", (self.lookup(key),)).rowcount > 0
+
+    def delete(self, key):
+        """Удаление записи; False, если ключа нет"""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM licenses WHERE lookup = ?", (self.lookup(key),)).rowcount > 0
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM licenses").fetchone()[0]
+
+    def records(self, batch_size=1000):
+        """Все записи [(id, запись)] в порядке добавления, пачками по batch_size"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, payload, revoked FROM licenses WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for entry_id, payload, revoked in rows:
+                yield entry_id, self._open(payload, revoked)
+            last_id = rows[-1][0]
+
+    def import_legacy(self, path=LICENSES_FILE):
+        """Однократный перенос списка из licenses.dat; файл переименовывается в .migrated"""
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            records = json.loads(self.fernet.decrypt(f.read().strip()))
+        self.add_many(records)
+        os.replace(path, path + ".migrated")
+        return len(records)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
 
 class LicenseManager:
     def __init__(self):
@@ -19,8 +124,8 @@ class LicenseManager:
         # Создаем интерфейс
         self.create_interface()
         
-        # Загружаем существующие ключи
-        self.license_keys = self.load_license_keys()
+        # Открываем хранилище ключей
+        self.store = self.open_license_store()
 
     def load_or_generate_key(self):
         """Загрузка или создание ключа для шифрования"""
@@ -48,24 +153,14 @@ class LicenseManager:
         cipher_suite = Fernet(self.key)
         return cipher_suite.decrypt(encrypted_data.encode()).decode()
 
-    def save_license_keys(self):
-        """Сохранение ключей в зашифрованном виде"""
-        encrypted_data = self.encrypt_data(json.dumps(self.license_keys))
-        with open("licenses.dat", "w") as f:
-            f.write(encrypted_data)
-
-    def load_license_keys(self):
-        """Загрузка сохраненных ключей"""
-        if os.path.exists("licenses.dat"):
-            try:
-                with open("licenses.dat", "r") as f:
-                    encrypted_data = f.read()
-                    decrypted_data = self.decrypt_data(encrypted_data)
-                    return json.loads(decrypted_data)
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось загрузить ключи: {str(e)}")
-                return []
-        return []
+    def open_license_store(self):
+        """Открытие хранилища с переносом прежнего licenses.dat"""
+        store = LicenseStore(self.key)
+        try:
+            store.import_legacy()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить ключи: {str(e)}")
+        return store
 
     def create_interface(self):
         """Создание интерфейса"""
@@ -100,10 +195,9 @@ class LicenseManager:
         license_key = self.generate_license_key()
         date_created = self.get_current_date()
         
-        self.license_keys.append({"key": license_key, "date": date_created})
-        self.save_license_keys()
-        
-        self.update_tree_view()
+        # Записывается и добавляется в список только новая запись
+        entry_id = self.store.add({"key": license_key, "date": date_created})
+        self.tree.insert("", "end", iid=str(entry_id), values=(license_key, date_created))
         messagebox.showinfo("Успех", f"Сгенерирован новый ключ: {license_key}")
 
     def delete_selected_key(self):
@@ -113,16 +207,17 @@ class LicenseManager:
             messagebox.showwarning("Внимание", "Выберите ключ для удаления")
             return
         
-        item_index = self.tree.index(selected_item[0])
-        del self.license_keys[item_index]
-        self.save_license_keys()
-        self.update_tree_view()
+        self.store.delete(self.tree.set(selected_item[0], "Ключ"))
+        self.tree.delete(selected_item[0])
 
     def update_tree_view(self):
         """Обновление отображаемого списка ключей"""
         self.tree.delete(*self.tree.get_children())
-        for item in self.license_keys:
-            self.tree.insert("", "end", values=(item["key"], item["date"]))
+        try:
+            for entry_id, item in self.store.records():
+                self.tree.insert("", "end", iid=str(entry_id), values=(item["key"], item["date"]))
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить ключи: {str(e)}")
 
     def get_current_date(self):
         """Получение текущей даты"""
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import secrets
+import statistics
+import subprocess
+import tempfile
+
+from genarator import PASSWORD_ALPHABET, generate_passwords, get_policy
+
+# Число паролей и длина по умолчанию
+DEFAULT_COUNT = 100000
+DEFAULT_LENGTH = 16
+# Число запусков для замера старта приложения
+DEFAULT_STARTUP_RUNS = 5
+# Допустимое время (медиана, секунды): импорт модуля и показ первого кадра окна
+IMPORT_BUDGET = 0.5
+FIRST_FRAME_BUDGET = 0.8
+
+# Выполняется в отдельном процессе: каждый запуск холодный, как у пользователя
+STARTUP_SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+import genarator
+imported = time.perf_counter() - start
+import tkinter  # После замера, чтобы не сократить время импорта
+frame = None
+try:
+    root = genarator.ctk.CTk()
+    app = genarator.PasswordGeneratorApp(root)
+    root.update()
+    frame = time.perf_counter() - start
+except tkinter.TclError:
+    pass  # Нет дисплея — замеряется только импорт; любая другая ошибка старта проваливает замер
+print(imported, frame, "cryptography" in sys.modules)
+"""
+
+
+# Прежний способ: отдельный вызов secrets.choice на каждый символ
+def legacy_passwords(n, length, alphabet=PASSWORD_ALPHABET):
+    for _ in range(n):
+        yield ''.join(secrets.choice(alphabet) for _ in range(length))
+
+
+def measure(func, n, length):
+    start = time.perf_counter()
+    count = sum(1 for _ in func(n, length))
+    return count, time.perf_counter() - start
+
+
+def bench_passwords(n, length):
+    print(f"{'Способ':>22} | {'Паролей/с':>12} | {'Ускорение':>9}")
+    _, legacy_time = measure(legacy_passwords, n, length)
+    count, bulk_time = measure(generate_passwords, n, length)
+    if count != n:
+        raise AssertionError("generate_passwords вернул не то число паролей")
+    policy = get_policy("default", length)
+    next(policy.generate(1))  # Импорт NumPy не входит в замер
+    count, policy_time = measure(lambda n, length: policy.generate(n), n, length)
+    if count != n:
+        raise AssertionError("PasswordPolicy.generate вернул не то число паролей")
+    print(f"{'secrets.choice':>22} | {n / legacy_time:>12.0f} | {1.0:8.1f}x")
+    print(f"{'generate_passwords':>22} | {n / bulk_time:>12.0f} | {legacy_time / bulk_time:8.1f}x")
+    print(f"{'PasswordPolicy':>22} | {n / policy_time:>12.0f} | {legacy_time / policy_time:8.1f}x")
+
+
+def bench_startup(runs):
+    # Время импорта genarator и до первого кадра окна; падает, если вышли за бюджет
+    # или если cryptography снова импортируется до первого обращения к истории
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)), env.get("PYTHONPATH")]))
+    imports, frames = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=tmp, env=env,
+                                    capture_output=True, text=True)
+            if result.returncode:
+                raise AssertionError(f"Приложение не запустилось:\n{result.stderr}")
+            output = result.stdout.split()
+            imports.append(float(output[0]))
+            if output[1] != "None":
+                frames.append(float(output[1]))
+            if output[2] == "True":
+                raise AssertionError("cryptography импортируется при запуске")
+    print(f"{'Этап':>14} | {'Минимум, мс':>11} | {'Медиана, мс':>11} | {'Бюджет, мс':>10}")
+    rows = [("импорт", imports, IMPORT_BUDGET), ("первый кадр", frames, FIRST_FRAME_BUDGET)]
+    for name, times, budget in rows:
+        if not times:
+            print(f"{name:>14} | {'нет дисплея':>11} | {'':>11} | {budget * 1000:>10.0f}")
+            continue
+        median = statistics.median(times)
+        print(f"{name:>14} | {min(times) * 1000:>11.1f} | {median * 1000:>11.1f} | {budget * 1000:>10.0f}")
+        if median > budget:
+            raise AssertionError(f"{name}: {median * 1000:.0f} мс, бюджет {budget * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    # python bench_genarator.py [число паролей] [длина] — генерация паролей
+    # python bench_genarator.py startup [запусков]      — время запуска приложения
+    if sys.argv[1:2] == ["startup"]:
+        bench_startup(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_STARTUP_RUNS)
+    else:
+        count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+        length = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LENGTH
+        bench_passwords(count, length)
@@ -0,0 +1,135 @@
+import io
+import itertools
+import os
+import sys
+import time
+import tempfile
+import uuid
+
+from Improved_License_Key_Manager import (
+    KEY_FILES, LicenseCrypto, LicenseExporter, LicenseSigner, LicenseStore, generate_license_keys, issue_licenses,
+)
+from license_verifier import LicenseVerifier
+
+# Число лицензий в хранилище по умолчанию
+DEFAULT_COUNTS = [10000, 100000, 1000000]
+# Сколько одиночных операций замерять на каждом размере хранилища по записям
+DEFAULT_OPERATIONS = 1000
+# Сколько ключей выпускать при замере массового выпуска
+DEFAULT_ISSUE_COUNT = 500000
+# Сколько токенов проверять при замере проверки подписи
+DEFAULT_TOKEN_COUNT = 10000
+
+
+def make_licenses(count):
+    # Ключи в формате приложения; дата одна на всех — на скорость это не влияет
+    date_created = "2024-01-01 12:00:00"
+    licenses = []
+    for _ in range(count):
+        raw = uuid.uuid4().hex
+        key = "-".join(raw[i:i + 5] for i in range(0, 35, 5)) + "-" + raw[35:]
+        licenses.append({"key": key, "date": date_created})
+    return licenses
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_store(counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        key_files = {name: os.path.join(tmp, name) for name in KEY_FILES}
+        crypto = LicenseCrypto(key_files)  # Генерация RSA-4096 не входит в замер
+        path = os.path.join(tmp, "licenses.dat")
+        print(f"{'Лицензий':>10} | {'Сохранение, с':>13} | {'Загрузка, с':>11} | {'Файл, MB':>9}")
+        for count in counts:
+            licenses = make_licenses(count)
+            _, save_time = measure(crypto.save, licenses, path)
+            loaded, load_time = measure(crypto.load, path)
+            if loaded != licenses:
+                raise AssertionError(f"Загруженные данные не совпадают для {count} лицензий")
+            size = os.path.getsize(path) / 1e6
+            print(f"{count:>10} | {save_time:>13.3f} | {load_time:>11.3f} | {size:>9.2f}")
+
+
+def bench_records(counts, operations=DEFAULT_OPERATIONS):
+    # Время одиночных операций хранилища по записям по мере его роста: должно оставаться постоянным
+    with tempfile.TemporaryDirectory() as tmp:
+        key_files = {name: os.path.join(tmp, name) for name in KEY_FILES}
+        store = LicenseStore(LicenseCrypto(key_files), os.path.join(tmp, "licenses.db"))
+        print(f"{'Лицензий':>10} | {'Добавление, мкс':>15} | {'Поиск, мкс':>10} | {'Отзыв, мкс':>10}")
+        filled = 0
+        for count in counts:
+            for start in range(filled, count, 10000):
+                store.add_many(make_licenses(min(10000, count - start)))
+            filled = max(filled, count)
+            licenses = make_licenses(operations)
+            _, add_time = measure(lambda: [store.add(record) for record in licenses])
+            _, get_time = measure(lambda: [store.get(record["key"]) for record in licenses])
+            _, revoke_time = measure(lambda: [store.revoke(record["key"]) for record in licenses])
+            filled += operations
+            print(f"{count:>10} | {add_time / operations * 1e6:>15.0f} | {get_time / operations * 1e6:>10.0f} | "
+                  f"{revoke_time / operations * 1e6:>10.0f}")
+        store.close()
+
+
+def bench_issue(count):
+    # Массовый выпуск: генерация и шифрование записей отдельно от записи в базу и выгрузки
+    metadata = {"customer": "ACME", "plan": "pro"}
+    with tempfile.TemporaryDirectory() as tmp:
+        key_files = {name: os.path.join(tmp, name) for name in KEY_FILES}
+        crypto = LicenseCrypto(key_files)
+        store = LicenseStore(crypto, os.path.join(tmp, "licenses.db"))
+        print(f"{'Этап':>26} | {'Ключей/с':>10}")
+
+        def prepare():
+            keys = generate_license_keys(count)
+            records = [dict(metadata, key=key, date="2024-01-01 12:00:00") for key in keys]
+            return store._seal_many(records)
+
+        _, prepare_time = measure(prepare)
+        print(f"{'генерация и шифрование':>26} | {count / prepare_time:>10.0f}")
+
+        memory_store = LicenseStore(crypto, ":memory:")
+        _, memory_time = measure(issue_licenses, memory_store, itertools.repeat(metadata, count))
+        print(f"{'выпуск в базу в памяти':>26} | {count / memory_time:>10.0f}")
+
+        output = io.StringIO()
+        issued, total_time = measure(
+            issue_licenses, store, itertools.repeat(metadata, count), 10000, LicenseExporter(output, "csv")
+        )
+        if issued != count or store.count() != count:
+            raise AssertionError("Сохранены не все ключи")
+        print(f"{'выпуск в файл с выгрузкой':>26} | {count / total_time:>10.0f}")
+        store.close()
+
+
+def bench_verify(count):
+    # Проверка подписанных токенов: первая проверка каждого токена и повторная (из кэша)
+    with tempfile.TemporaryDirectory() as tmp:
+        public_key_file = os.path.join(tmp, "license_verify.pem")
+        signer = LicenseSigner(os.path.join(tmp, "license_signing.pem"), public_key_file)
+        tokens = [signer.sign(record) for record in make_licenses(count)]
+        verifier = LicenseVerifier(public_key_file, cache_size=count)
+        print(f"{'Проверка':>10} | {'мкс/токен':>10}")
+        for name in ("первая", "из кэша"):
+            _, elapsed = measure(lambda: [verifier.verify(token) for token in tokens])
+            print(f"{name:>10} | {elapsed / count * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    # python bench_license.py [число лицензий...]         — сохранение и загрузка licenses.dat
+    # python bench_license.py records [число лицензий...] — одиночные операции хранилища по записям
+    # python bench_license.py issue [число ключей]         — массовый выпуск ключей
+    # python bench_license.py verify [число токенов]       — проверка подписанных токенов
+    if sys.argv[1:2] == ["records"]:
+        bench_records([int(arg) for arg in sys.argv[2:]] or DEFAULT_COUNTS)
+    elif sys.argv[1:2] == ["issue"]:
+        bench_issue(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ISSUE_COUNT)
+    elif sys.argv[1:2] == ["verify"]:
+        bench_verify(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TOKEN_COUNT)
+    else:
+        counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_COUNTS
+        bench_store(counts)
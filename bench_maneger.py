@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+from maneger import CustomCipher, KeyStore, _load_numpy, process_tree
+
+# Размеры входных данных по умолчанию: 1 KB, 1 MB, 100 MB
+DEFAULT_SIZES = [1024, 1024 * 1024, 100 * 1024 * 1024]
+# Число мелких файлов для замера параллельной обработки
+DEFAULT_FILE_COUNT = 5000
+
+
+# Прежний посимвольный цикл — эталон для сравнения
+def legacy_substitute(cipher, text):
+    encrypted_text = []
+    for char in text:
+        if char.lower() in cipher.encrypt_dict:
+            encrypted_text.append(cipher.encrypt_dict[char.lower()])
+        elif char in cipher.encrypt_digit_dict:
+            encrypted_text.append(cipher.encrypt_digit_dict[char])
+        else:
+            encrypted_text.append(char)
+    return ''.join(encrypted_text)
+
+
+def make_text(size):
+    # Смесь кириллицы (в обоих регистрах), цифр, латиницы и пунктуации
+    alphabet = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ0123456789 .,!?abcXYZ"
+    rng = random.Random(42)
+    sample = ''.join(rng.choice(alphabet) for _ in range(min(size, 64 * 1024)))
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def measure(func, text):
+    start = time.perf_counter()
+    result = func(text)
+    elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def format_speed(size, elapsed):
+    return f"{size / elapsed / 1e6:10.2f} M симв/с" if elapsed > 0 else "         inf"
+
+
+def bench_substitution(sizes):
+    # Временный файл ключей, чтобы не трогать ключи приложения
+    with tempfile.TemporaryDirectory() as tmp:
+        key_store = KeyStore(os.path.join(tmp, "bench.key"))
+        _bench_substitution(sizes, key_store)
+
+
+def _bench_substitution(sizes, key_store):
+    cipher = CustomCipher(key_store, backend="python")
+    # Без NumPy шифр молча переходит на str.translate — такой столбец не выдается за NumPy
+    numpy_cipher = CustomCipher(key_store, backend="numpy") if _load_numpy() is not None else None
+    if numpy_cipher is not None:
+        numpy_cipher.substitute("прогрев")  # Построение таблицы не входит в замер
+    else:
+        print("NumPy не установлен: столбец NumPy пропущен")
+    print(f"{'Размер':>12} | {'Старый цикл':>18} | {'str.translate':>18} | {'NumPy':>18} | {'Ускорение':>9}")
+    for size in sizes:
+        text = make_text(size)
+        legacy, legacy_time = measure(lambda t: legacy_substitute(cipher, t), text)
+        fast, fast_time = measure(cipher.substitute, text)
+        if numpy_cipher is not None:
+            vectorized, numpy_time = measure(numpy_cipher.substitute, text)
+            numpy_column = format_speed(size, numpy_time)
+        else:
+            vectorized, numpy_time = fast, fast_time
+            numpy_column = f"{'нет NumPy':>18}"
+        if not legacy == fast == vectorized:
+            raise AssertionError(f"Результаты не совпадают для размера {size}")
+        best_time = min(fast_time, numpy_time)
+        speedup = legacy_time / best_time if best_time > 0 else float("inf")
+        print(f"{size:>12} | {format_speed(size, legacy_time)} | {format_speed(size, fast_time)} | "
+              f"{numpy_column} | {speedup:8.1f}x")
+
+
+def bench_parallel(file_count):
+    # Пропускная способность пакетного шифрования в зависимости от числа процессов
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir = os.path.join(tmp, "src")
+        os.makedirs(src_dir)
+        text = make_text(2048)
+        for i in range(file_count):
+            with open(os.path.join(src_dir, f"{i:06d}.txt"), "w", encoding="utf-8") as file:
+                file.write(text)
+        key_file = os.path.join(tmp, "bench.key")
+
+        cores = os.cpu_count() or 1
+        worker_counts = sorted({count for count in (1, 2, 4, 8, cores) if count <= cores})
+        print(f"{'Процессов':>9} | {'Файлов/с':>10} | {'Ускорение':>9}")
+        baseline = None
+        for workers in worker_counts:
+            dst_dir = os.path.join(tmp, f"dst{workers}")
+            start = time.perf_counter()
+            results = process_tree(src_dir, dst_dir, key_file=key_file, workers=workers)
+            elapsed = time.perf_counter() - start
+            if any(result["status"] != "ok" for result in results):
+                raise AssertionError("Не все файлы обработаны")
+            rate = file_count / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>9} | {rate:>10.0f} | {rate / baseline:8.2f}x")
+
+
+if __name__ == "__main__":
+    # python bench_maneger.py [размеры...]          — подстановка символов
+    # python bench_maneger.py parallel [число файлов] — пакетная обработка в пуле процессов
+    if sys.argv[1:2] == ["parallel"]:
+        bench_parallel(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FILE_COUNT)
+    else:
+        sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+        bench_substitution(sizes)
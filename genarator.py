@@ -1,35 +1,998 @@
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import messagebox
-import secrets
 import string
 import os
-from cryptography.fernet import Fernet
+import sys
+import csv
+import hmac
+import hashlib
+import math
+import re
+import secrets
+import argparse
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from datetime import datetime
+# cryptography и concurrent.futures импортируются при первом обращении,
+# чтобы не задерживать появление окна
 
 # Файлы для истории
+VAULT_FILE = "vault.db"
+KEY_FILE = "secret.key"
+# Индекс уже выданных адресов (по 8 байт HMAC на адрес) для проверки уникальности
+EMAIL_INDEX_FILE = "emails.idx"
+# Прежние файлы истории (по токену в строке), переносятся в хранилище при запуске
 PASSWORD_FILE = "passwords.enc"
 EMAIL_FILE = "emails.enc"
-KEY_FILE = "secret.key"
+# Состояние незавершенной смены ключа (для продолжения после сбоя)
+ROTATION_CHECKPOINT_FILE = "rotation.json"
+# Сколько записей истории показывать за раз
+HISTORY_PAGE_SIZE = 50
+# Через сколько миллисекунд после создания окна в фоне открываются ключ и история
+WARMUP_DELAY_MS = 200
 
 # Генерация ключа шифрования
-def generate_key():
-    if not os.path.exists(KEY_FILE):
+def generate_key(key_file_path=KEY_FILE):
+    if not os.path.exists(key_file_path):
+        from cryptography.fernet import Fernet
         key = Fernet.generate_key()
-        with open(KEY_FILE, "wb") as key_file:
+        with open(key_file_path, "wb") as key_file:
             key_file.write(key)
 
 # Загрузка ключа шифрования
-def load_key():
-    return open(KEY_FILE, "rb").read()
+def load_key(key_file_path=KEY_FILE):
+    with open(key_file_path, "rb") as key_file:
+        return key_file.read()
+
+# Объекты Fernet по ключу, чтобы не создавать их на каждый вызов
+_fernets = {}
+
+def get_fernet(key):
+    fernet = _fernets.get(key)
+    if fernet is None:
+        from cryptography.fernet import Fernet
+        fernet = _fernets[key] = Fernet(key)
+    return fernet
 
 # Шифрование данных
 def encrypt_data(data, key):
-    fernet = Fernet(key)
-    return fernet.encrypt(data.encode())
+    return get_fernet(key).encrypt(data.encode())
 
 # Дешифрование данных
 def decrypt_data(encrypted_data, key):
-    fernet = Fernet(key)
-    return fernet.decrypt(encrypted_data).decode()
+    return get_fernet(key).decrypt(encrypted_data).decode()
+
+# Менеджер ключа: ключ читается один раз, объект Fernet переиспользуется.
+# timing_hook(операция, число записей, секунды) вызывается после каждого вызова
+class CipherManager:
+    def __init__(self, key_file=KEY_FILE, timing_hook=None):
+        self.key_file = key_file
+        self.timing_hook = timing_hook
+        self._key = None
+        self._fernet = None
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        if self._key is None:
+            with self._lock:
+                if self._key is None:
+                    generate_key(self.key_file)
+                    self._key = load_key(self.key_file)
+        return self._key
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            self._fernet = get_fernet(self.key)
+        return self._fernet
+
+    def encrypt(self, data):
+        return self.encrypt_many([data])[0]
+
+    def decrypt(self, token):
+        return self.decrypt_many([token])[0]
+
+    def encrypt_many(self, values):
+        start = time.perf_counter()
+        fernet = self.fernet
+        tokens = [fernet.encrypt(value.encode()) for value in values]
+        self._report("encrypt", len(tokens), start)
+        return tokens
+
+    def decrypt_many(self, tokens):
+        # Пакетная расшифровка: один объект Fernet и одно измерение времени на весь список
+        start = time.perf_counter()
+        fernet = self.fernet
+        values = [fernet.decrypt(token).decode() for token in tokens]
+        self._report("decrypt", len(values), start)
+        return values
+
+    def _report(self, operation, count, start):
+        if self.timing_hook is not None:
+            self.timing_hook(operation, count, time.perf_counter() - start)
+
+# Алфавит паролей по умолчанию
+PASSWORD_ALPHABET = string.ascii_letters + string.digits + string.punctuation
+# Размер блока энтропии, читаемого из os.urandom за один вызов
+ENTROPY_BLOCK_SIZE = 64 * 1024
+
+# Выборка символов алфавита из случайных байтов без смещения (отбрасыванием).
+# Байт b принимается, только если b < limit (limit кратен размеру алфавита), символ — alphabet[b % size]
+class AlphabetSampler:
+    def __init__(self, alphabet):
+        self.alphabet = "".join(dict.fromkeys(alphabet))  # Повторы в алфавите дали бы смещение
+        self.size = len(self.alphabet)
+        if not 1 <= self.size <= 256:
+            raise ValueError("Алфавит должен содержать от 1 до 256 различных символов")
+        self.limit = 256 - 256 % self.size
+        if self.alphabet.isascii():
+            # Весь блок обрабатывается одним вызовом bytes.translate
+            self._table = bytes(ord(self.alphabet[b % self.size]) if b < self.limit else 0 for b in range(256))
+            self._rejected = bytes(range(self.limit, 256))
+        else:
+            self._table = None
+
+    def sample(self, nbytes):
+        # Строка случайных символов из nbytes байтов энтропии (в среднем nbytes * limit / 256 символов)
+        block = os.urandom(nbytes)
+        if self._table is not None:
+            return block.translate(self._table, self._rejected).decode("ascii")
+        np = _load_numpy()
+        if np is not None:
+            codes = np.frombuffer(block, dtype=np.uint8)
+            # При limit == 256 отбрасывать нечего, при size == 256 — нечего сокращать (256 не помещается в uint8)
+            if self.limit < 256:
+                codes = codes[codes < self.limit]
+            if self.size < 256:
+                codes = codes % self.size
+            lookup = np.array([ord(char) for char in self.alphabet], dtype=np.uint32)
+            return lookup[codes].tobytes().decode("utf-32-le")
+        return "".join(self.alphabet[b % self.size] for b in block if b < self.limit)
+
+    def bytes_for(self, count):
+        # Сколько байтов энтропии нужно на count символов (с запасом на отброшенные байты)
+        return int(count * 256 / self.limit * 1.1) + 16
+
+# NumPy — необязательная зависимость, импортируется при первом обращении
+_numpy = False
+
+def _load_numpy():
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+# Скомпилированные алфавиты переиспользуются между вызовами
+@lru_cache(maxsize=64)
+def compile_alphabet(alphabet):
+    return AlphabetSampler(alphabet)
+
+# Массовая генерация паролей: энтропия читается крупными блоками, пароли отдаются генератором
+def generate_passwords(n, length, alphabet=PASSWORD_ALPHABET):
+    sampler = alphabet if isinstance(alphabet, AlphabetSampler) else compile_alphabet(alphabet)
+    block_size = min(ENTROPY_BLOCK_SIZE, sampler.bytes_for(n * length))
+    buffer = ""
+    position = 0
+    for _ in range(n):
+        while len(buffer) - position < length:
+            buffer = buffer[position:] + sampler.sample(block_size)
+            position = 0
+        yield buffer[position:position + length]
+        position += length
+
+# Классы символов для политик паролей
+CHARACTER_CLASSES = {
+    "lower": string.ascii_lowercase,
+    "upper": string.ascii_uppercase,
+    "digits": string.digits,
+    "symbols": string.punctuation,
+}
+# Символы, которые легко перепутать при чтении
+AMBIGUOUS_CHARS = "Il1|O0o`'\""
+# Сколько паролей политика собирает за один проход
+POLICY_BATCH_SIZE = 4096
+# Предельная длина пароля политики: позиции обязательных символов выбираются из алфавита до 256 "символов"
+MAX_POLICY_LENGTH = 256
+
+# Политика паролей: допустимые классы, обязательные классы и исключенные символы.
+# Алфавиты компилируются один раз в конструкторе; обязательные символы ставятся на случайные
+# различные позиции пароля из общего алфавита — ограничения выполняются без повторных попыток
+class PasswordPolicy:
+    def __init__(self, length=16, classes=("lower", "upper", "digits", "symbols"), required=None,
+                 exclude="", exclude_ambiguous=False, name="custom"):
+        self.name = name
+        self.length = length
+        self.classes = tuple(classes)
+        self.required = tuple(self.classes if required is None else required)
+        self.exclude = set(exclude) | (set(AMBIGUOUS_CHARS) if exclude_ambiguous else set())
+
+        if not 1 <= length <= MAX_POLICY_LENGTH:
+            raise ValueError(f"Длина пароля должна быть от 1 до {MAX_POLICY_LENGTH}")
+        unknown = [name for name in self.classes + self.required if name not in CHARACTER_CLASSES]
+        if unknown:
+            raise ValueError(f"Неизвестные классы символов: {', '.join(unknown)}")
+        if length < len(self.required):
+            raise ValueError("Длина пароля меньше числа обязательных классов символов")
+
+        self.class_alphabets = {}
+        for class_name in set(self.classes + self.required):
+            alphabet = "".join(char for char in CHARACTER_CLASSES[class_name] if char not in self.exclude)
+            if not alphabet:
+                raise ValueError(f"После исключений в классе {class_name} не осталось символов")
+            self.class_alphabets[class_name] = alphabet
+        self.alphabet = "".join(self.class_alphabets[class_name] for class_name in self.classes)
+        self._sampler = compile_alphabet(self.alphabet)
+        self._required_samplers = [compile_alphabet(self.class_alphabets[class_name]) for class_name in self.required]
+        # Случайная позиция из m оставшихся выбирается как "символ" алфавита chr(0)..chr(m - 1)
+        self._position_samplers = [compile_alphabet("".join(map(chr, range(length - slot))))
+                                   for slot in range(len(self.required))]
+
+    def generate(self, n):
+        # Генератор n паролей, каждый из которых удовлетворяет политике
+        remaining = n
+        while remaining > 0:
+            batch = min(remaining, POLICY_BATCH_SIZE)
+            yield from self._generate_batch(batch)
+            remaining -= batch
+
+    def _generate_batch(self, n):
+        if not self.required:
+            yield from generate_passwords(n, self.length, self._sampler)
+            return
+        required_chars = [next(generate_passwords(1, n, sampler)) for sampler in self._required_samplers]
+        positions = [next(generate_passwords(1, n, sampler)) for sampler in self._position_samplers]
+        np = _load_numpy()
+        if np is not None and self.alphabet.isascii():
+            yield from self._place_numpy(np, n, required_chars, positions)
+            return
+        slots = range(len(self.required))
+        last = self.length - 1
+        for index, base in enumerate(generate_passwords(n, self.length, self._sampler)):
+            chars = list(base)
+            free = list(range(self.length))
+            for slot in slots:
+                # Частичная перетасовка Фишера — Йетса: занятая позиция заменяется последней свободной
+                pick = ord(positions[slot][index])
+                chars[free[pick]] = required_chars[slot][index]
+                free[pick] = free[last - slot]
+            yield "".join(chars)
+
+    def _place_numpy(self, np, n, required_chars, positions):
+        # Та же расстановка, но сразу для всей пачки паролей (матрица n x length)
+        length = self.length
+        base = next(generate_passwords(1, n * length, self._sampler)).encode("ascii")
+        chars = np.frombuffer(base, dtype=np.uint8).reshape(n, length).copy()
+        free = np.tile(np.arange(length), (n, 1))
+        rows = np.arange(n)
+        for slot in range(len(self.required)):
+            pick = np.frombuffer(positions[slot].encode("latin-1"), dtype=np.uint8)  # chr(0)..chr(255) -> байт
+            chars[rows, free[rows, pick]] = np.frombuffer(required_chars[slot].encode("ascii"), dtype=np.uint8)
+            free[rows, pick] = free[:, length - 1 - slot]
+        data = chars.tobytes().decode("ascii")
+        for start in range(0, n * length, length):
+            yield data[start:start + length]
+
+    def validate(self, password):
+        if len(password) != self.length or any(char not in self.alphabet for char in password):
+            return False
+        return all(any(char in self.class_alphabets[class_name] for char in password) for class_name in self.required)
+
+# Готовые политики для типичных систем
+POLICY_PRESETS = {
+    "default": dict(length=16),
+    "active_directory": dict(length=14, exclude_ambiguous=True),
+    "database": dict(length=24, exclude="'\"\\`;@/"),
+    "shell_safe": dict(length=20, exclude="'\"\\`$!&|;<>(){}[]*?~#"),
+    "url_safe": dict(length=24, exclude="".join(char for char in string.punctuation if char not in "-_.~")),
+    "wifi": dict(length=20, classes=("lower", "upper", "digits"), exclude_ambiguous=True),
+    "pin": dict(length=6, classes=("digits",)),
+}
+
+@lru_cache(maxsize=None)
+def get_policy(name="default", length=None):
+    # Политика по имени пресета; length переопределяет длину пресета
+    if name not in POLICY_PRESETS:
+        raise ValueError(f"Неизвестная политика: {name}")
+    options = dict(POLICY_PRESETS[name])
+    if length is not None:
+        options["length"] = length
+    return PasswordPolicy(name=name, **options)
+
+VAULT_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, created TEXT NOT NULL, payload BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS entries_kind ON entries (kind, id)",
+]
+
+# Хранилище истории: SQLite, значение хранится Fernet-токеном, расшифровываются только запрошенные строки
+class Vault:
+    def __init__(self, cipher, path=VAULT_FILE):
+        self.cipher = cipher
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in VAULT_SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    def add(self, kind, value):
+        return self.add_many(kind, [value])[0]
+
+    def add_many(self, kind, values):
+        # Все значения записываются одной транзакцией; возвращает их id
+        return self.add_records([(kind, value) for value in values])
+
+    def add_records(self, records):
+        # Записи [(kind, значение)] разных типов: одно пакетное шифрование и одна транзакция
+        created = datetime.now().isoformat(timespec="seconds")
+        tokens = self.cipher.encrypt_many([value for _, value in records])
+        return self._insert([(kind, created, token) for (kind, _), token in zip(records, tokens)])
+
+    def set_sync(self, mode):
+        # Политика fsync: "full" — при каждой транзакции, "normal" — при контрольных точках WAL,
+        # "off" — на усмотрение ОС
+        if mode not in ("full", "normal", "off"):
+            raise ValueError(f"Неизвестная политика синхронизации: {mode}")
+        with self._lock:
+            self._db.execute(f"PRAGMA synchronous={mode.upper()}")
+
+    def _insert(self, rows):
+        with self._lock, self._db:
+            ids = []
+            for row in rows:
+                ids.append(self._db.execute("INSERT INTO entries (kind, created, payload) VALUES (?, ?, ?)", row).lastrowid)
+            return ids
+
+    def count(self, kind):
+        # Без расшифровки
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def page(self, kind, limit=HISTORY_PAGE_SIZE, offset=0, newest_first=True):
+        # Страница записей [(id, created, значение)]; расшифровываются только строки страницы
+        rows = self.page_tokens(kind, limit, offset, newest_first)
+        values = self.cipher.decrypt_many([payload for _, _, payload in rows])
+        return [(entry_id, created, value) for (entry_id, created, _), value in zip(rows, values)]
+
+    def page_tokens(self, kind, limit=HISTORY_PAGE_SIZE, offset=0, newest_first=True, after_id=None):
+        # Страница без расшифровки [(id, created, токен)].
+        # after_id продолжает выборку за указанной записью (по индексу, без OFFSET)
+        order = "DESC" if newest_first else "ASC"
+        query = "SELECT id, created, payload FROM entries WHERE kind = ?"
+        params = [kind]
+        if after_id is not None:
+            query += " AND id < ?" if newest_first else " AND id > ?"
+            params.append(after_id)
+        query += f" ORDER BY id {order} LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def get(self, entry_id):
+        # Запись по id: (kind, created, значение) или None
+        with self._lock:
+            row = self._db.execute("SELECT kind, created, payload FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], self.cipher.decrypt(row[2])
+
+    def import_legacy(self, path, kind):
+        # Одноразовый перенос токенов из прежнего файла (без перешифрования)
+        if not os.path.exists(path):
+            return 0
+        created = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+        with open(path, "rb") as file:
+            rows = [(kind, created, line.strip()) for line in file if line.strip()]
+        self._insert(rows)
+        os.replace(path, path + ".migrated")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# Смена ключа с перешифрованием истории. Данные читаются пачками по chunk_size и
+# перешифровываются MultiFernet.rotate во временные файлы, которые в конце атомарно заменяют
+# исходные (затем заменяется и ключ). После каждой пачки состояние сохраняется в контрольную
+# точку, и прерванная смена продолжается повторным запуском. Приложение при этом должно быть закрыто
+class KeyRotationJob:
+    def __init__(self, key_file=KEY_FILE, vault_path=VAULT_FILE, legacy_files=(PASSWORD_FILE, EMAIL_FILE),
+                 checkpoint_path=ROTATION_CHECKPOINT_FILE, index_path=EMAIL_INDEX_FILE, chunk_size=1000, progress=None):
+        self.key_file = key_file
+        self.new_key_file = key_file + ".new"
+        self.vault_path = vault_path
+        self.legacy_files = legacy_files
+        self.checkpoint_path = checkpoint_path
+        self.index_path = index_path
+        self.chunk_size = chunk_size
+        # progress(обработано, всего) вызывается после каждой пачки
+        self.progress = progress
+
+    def run(self):
+        state = self._load_checkpoint()
+        if state is None:
+            state = self._start()
+        if state["phase"] == "copy":
+            from cryptography.fernet import MultiFernet
+            with open(self.key_file, "rb") as old_file, open(self.new_key_file, "rb") as new_file:
+                self._fernet = MultiFernet([get_fernet(new_file.read()), get_fernet(old_file.read())])
+            self._copy(state)
+            state["phase"] = "swap"
+            self._save_checkpoint(state)
+        self._swap(state)
+        os.remove(self.checkpoint_path)
+        return state["done"]
+
+    def _start(self):
+        from cryptography.fernet import Fernet
+        generate_key(self.key_file)
+        _write_atomic(self.new_key_file, Fernet.generate_key())
+        state = {"phase": "copy", "last_id": 0, "legacy_done": [], "done": 0}
+        self._save_checkpoint(state)
+        return state
+
+    def _total(self):
+        total = 0
+        for path in self.legacy_files:
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    total += sum(1 for line in file if line.strip())
+        if os.path.exists(self.vault_path):
+            db = sqlite3.connect(self.vault_path)
+            try:
+                total += db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            finally:
+                db.close()
+        return total
+
+    def _report(self, state, total):
+        if self.progress is not None:
+            self.progress(state["done"], total)
+
+    def _copy(self, state):
+        total = self._total()
+        for path in self.legacy_files:
+            if path in state["legacy_done"] or not os.path.exists(path):
+                continue
+            # Файл перешифровывается построчно заново; в памяти — одна пачка строк
+            with open(path, "rb") as source, open(path + ".rotating", "wb") as target:
+                chunk = []
+                for line in source:
+                    if line.strip():
+                        chunk.append(line.strip())
+                    if len(chunk) >= self.chunk_size:
+                        self._write_legacy_chunk(target, chunk, state, total)
+                        chunk = []
+                self._write_legacy_chunk(target, chunk, state, total)
+                target.flush()
+                os.fsync(target.fileno())
+            state["legacy_done"].append(path)
+            self._save_checkpoint(state)
+
+        if not os.path.exists(self.vault_path):
+            return
+        tmp_path = self.vault_path + ".rotating"
+        if not state["last_id"] and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        source = sqlite3.connect(self.vault_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            # Все изменения из WAL переносятся в основной файл до начала копирования
+            source.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            for statement in VAULT_SCHEMA:
+                target.execute(statement)
+            while True:
+                rows = source.execute(
+                    "SELECT id, kind, created, payload FROM entries WHERE id > ? ORDER BY id LIMIT ?",
+                    (state["last_id"], self.chunk_size),
+                ).fetchall()
+                if not rows:
+                    break
+                with target:
+                    target.executemany(
+                        "INSERT OR REPLACE INTO entries (id, kind, created, payload) VALUES (?, ?, ?, ?)",
+                        [(entry_id, kind, created, self._fernet.rotate(payload)) for entry_id, kind, created, payload in rows],
+                    )
+                state["last_id"] = rows[-1][0]
+                state["done"] += len(rows)
+                self._save_checkpoint(state)
+                self._report(state, total)
+        finally:
+            source.close()
+            target.close()
+
+    def _write_legacy_chunk(self, target, chunk, state, total):
+        if chunk:
+            target.write(b"".join(self._fernet.rotate(token) + b"\n" for token in chunk))
+            state["done"] += len(chunk)
+            self._report(state, total)
+
+    def _swap(self, state):
+        # Каждый шаг идемпотентен: при повторном запуске выполняются только оставшиеся.
+        # Ключи здесь не читаются: если .new уже нет, ключ заменен до сбоя и остается удалить контрольную точку
+        for path in state["legacy_done"]:
+            if os.path.exists(path + ".rotating"):
+                os.replace(path + ".rotating", path)
+        tmp_path = self.vault_path + ".rotating"
+        if os.path.exists(tmp_path):
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(self.vault_path + suffix):
+                    os.remove(self.vault_path + suffix)
+            os.replace(tmp_path, self.vault_path)
+        # Индекс почт построен на HMAC со старым ключом — он будет построен заново
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        if os.path.exists(self.new_key_file):
+            os.replace(self.new_key_file, self.key_file)
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_checkpoint(self, state):
+        _write_atomic(self.checkpoint_path, json.dumps(state).encode())
+
+# Запись файла через временный файл и атомарную замену
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+# Буферизованная запись в хранилище: записи копятся и сохраняются одной транзакцией
+# (с одним пакетным шифрованием) каждые batch_size записей или interval_ms миллисекунд.
+# Каждая запись остается отдельной строкой, поэтому окно истории читает их как обычно
+class VaultAppender:
+    def __init__(self, vault, batch_size=256, interval_ms=200, sync="normal"):
+        self.vault = vault
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        vault.set_sync(sync)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="VaultAppender", daemon=True)
+        self._thread.start()
+        # Остаток буфера сохраняется и при обычном завершении процесса
+        atexit.register(self.close)
+
+    def append(self, kind, value):
+        with self._lock:
+            self._buffer.append((kind, value))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            if records:
+                try:
+                    self.vault.add_records(records)
+                except Exception:
+                    # Записи возвращаются в начало буфера и будут сохранены следующей попыткой
+                    with self._lock:
+                        self._buffer[:0] = records
+                    raise
+
+    def close(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            atexit.unregister(self.close)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Не сохранено записей истории: {len(self._buffer)} ({e})", file=sys.stderr)
+                raise
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Ошибка записи истории: {e}", file=sys.stderr)
+
+# Индекс уникальности адресов: множество усеченных HMAC-SHA256 (ключ — ключ шифрования),
+# так что сами адреса в открытом виде не хранятся. Проверка и добавление — O(1)
+class EmailIndex:
+    DIGEST_SIZE = 8
+
+    def __init__(self, cipher, vault=None, path=EMAIL_INDEX_FILE):
+        self.cipher = cipher
+        self.vault = vault
+        self.path = path
+        self._digests = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def digest(self, email):
+        return hmac.new(self.cipher.key, email.lower().encode(), hashlib.sha256).digest()[:self.DIGEST_SIZE]
+
+    def _load(self):
+        if self._digests is not None:
+            return self._digests
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as file:
+                data = file.read()
+            size = self.DIGEST_SIZE
+            self._digests = {data[start:start + size] for start in range(0, len(data) - len(data) % size, size)}
+        else:
+            # Первый запуск: индекс строится по уже сохраненным адресам (однократно)
+            self._digests = set()
+            if self.vault is not None:
+                self._write(self._backfill())
+        return self._digests
+
+    def _backfill(self):
+        digests = []
+        last_id = None
+        while True:
+            rows = self.vault.page_tokens("email", 1000, after_id=last_id)
+            if not rows:
+                break
+            digests.extend(self.digest(email) for email in self.cipher.decrypt_many([row[2] for row in rows]))
+            last_id = rows[-1][0]
+        return digests
+
+    def __contains__(self, email):
+        with self._lock:
+            return self.digest(email) in self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+    def reserve(self, email):
+        # Добавляет адрес, если его еще нет; возвращает False при совпадении
+        digest = self.digest(email)
+        with self._lock:
+            digests = self._load()
+            if digest in digests:
+                return False
+            digests.add(digest)
+            self._pending.append(digest)
+            return True
+
+    def flush(self):
+        # Дописывает зарезервированные адреса в файл индекса одной записью
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                with open(self.path, "ab") as file:
+                    file.write(b"".join(pending))
+
+    def _write(self, digests):
+        self._digests.update(digests)
+        with open(self.path, "ab") as file:
+            file.write(b"".join(digests))
+
+# Адрес из имени, фамилии и числа в формате приложения
+def format_email(name, surname, number):
+    return f"{name.strip().lower()}.{surname.strip().lower()}{str(number).strip()}@gmail.com"
+
+# Уникальные адреса для строк (имя, фамилия[, число]). При совпадении к числу добавляется
+# случайный суффикс, поэтому в среднем хватает одной-двух проверок
+def generate_emails(rows, index):
+    for row in rows:
+        name, surname = row[0], row[1]
+        number = row[2] if len(row) > 2 and str(row[2]).strip() else secrets.randbelow(1000)
+        email = format_email(name, surname, number)
+        while not index.reserve(email):
+            email = format_email(name, surname, f"{number}{secrets.randbelow(10000):04d}")
+        yield email
+
+# Пакетная генерация: адреса сохраняются в хранилище и индекс пачками по batch_size
+def generate_emails_bulk(rows, vault, index, batch_size=1000):
+    batch = []
+    for email in generate_emails(rows, index):
+        batch.append(email)
+        if len(batch) >= batch_size:
+            vault.add_many("email", batch)
+            index.flush()
+            yield from batch
+            batch = []
+    if batch:
+        vault.add_many("email", batch)
+        index.flush()
+        yield from batch
+
+# Строки из CSV (путь или открытый файл): столбцы name, surname, number (заголовок необязателен)
+def read_names_csv(source):
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8") as file:
+            yield from read_names_csv(file)
+        return
+    reader = csv.reader(source)
+    for row in reader:
+        if not row or [cell.strip().lower() for cell in row[:2]] == ["name", "surname"]:
+            continue
+        if len(row) < 2:
+            raise ValueError(f"В строке {reader.line_num} нужны как минимум имя и фамилия")
+        yield row
+
+# Оценка стойкости паролей: энтропия по размеру алфавита и длине минус штрафы за повторы,
+# последовательности (abc, 123) и словарные слова
+STRENGTH_LABELS = ["очень слабый", "слабый", "средний", "сильный", "очень сильный"]
+# Пороги энтропии (бит) для оценок 1..4
+STRENGTH_THRESHOLDS = [28, 36, 60, 128]
+# Частые пароли, слова и клавиатурные последовательности
+COMMON_WORDS = [
+    "password", "passw0rd", "qwerty", "qwertz", "azerty", "asdf", "zxcv", "admin", "root", "login",
+    "welcome", "letmein", "monkey", "dragon", "master", "secret", "shadow", "sunshine", "princess",
+    "football", "baseball", "iloveyou", "trustno1", "superman", "batman", "access", "hello",
+    "111111", "123123", "654321", "666666", "000000", "1q2w3e", "qazwsx", "pass", "user", "test",
+    "пароль", "йцукен", "привет", "любовь",
+]
+# Сколько бит дает словарное слово целиком (примерно log2 размера словаря частых слов)
+WORD_BITS = 10
+STRENGTH_CACHE_SIZE = 1_000_000
+
+_common_words = re.compile("|".join(sorted(map(re.escape, COMMON_WORDS), key=len, reverse=True)))
+# Класс символа по коду (< 128): 0 — строчные, 1 — заглавные, 2 — цифры, 3 — знаки; остальное — 4
+_CLASS_SIZES = [26, 26, 10, 33, 100]
+
+def _char_class(code):
+    char = chr(code)
+    if char in string.ascii_lowercase:
+        return 0
+    if char in string.ascii_uppercase:
+        return 1
+    if char in string.digits:
+        return 2
+    if char in string.punctuation or char == " ":
+        return 3
+    return 4
+
+_CLASS_TABLE = [_char_class(code) for code in range(128)]
+
+class StrengthScorer:
+    def __init__(self, cache_size=STRENGTH_CACHE_SIZE):
+        self.cache_size = cache_size
+        # Кэш по хешу пароля (сам пароль не хранится): хеш -> (оценка, энтропия)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(password):
+        return hashlib.blake2b(password.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def score(self, password):
+        return self.score_many([password])[0]
+
+    def score_many(self, passwords):
+        # [(оценка 0..4, энтропия в битах)] в порядке passwords; уже оцененные берутся из кэша
+        passwords = list(passwords)
+        digest = self._digest
+        digests = [digest(password) for password in passwords]
+        with self._lock:
+            cache_get = self._cache.get
+            results = [cache_get(key) for key in digests]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            scored = self._score_batch([passwords[index] for index in missing])
+            with self._lock:
+                if len(self._cache) + len(missing) > self.cache_size:
+                    self._cache.clear()
+                for index, result in zip(missing, scored):
+                    results[index] = result
+                    self._cache[digests[index]] = result
+        return results
+
+    def _score_batch(self, passwords):
+        np = _load_numpy()
+        if np is None:
+            results = []
+            for password in passwords:
+                entropy, bits_per_char = self._base_entropy(password)
+                for match in _common_words.finditer(password.lower()):
+                    entropy -= max(len(match.group()) * bits_per_char - WORD_BITS, 0)
+                entropy = max(entropy, 0.0)
+                results.append((sum(1 for threshold in STRENGTH_THRESHOLDS if entropy >= threshold), round(entropy, 1)))
+            return results
+
+        entropy, bits_per_char = self._base_entropies_numpy(np, passwords)
+        # Словарный штраф: найденное слово дает WORD_BITS вместо побуквенной энтропии.
+        # Поиск идет одним проходом по всем паролям, склеенным через перевод строки
+        joined = "\n".join(passwords)
+        lowered = joined.lower()
+        if len(lowered) == len(joined):
+            starts = np.cumsum([0] + [len(password) + 1 for password in passwords[:-1]])
+            matches = [(match.start(), len(match.group())) for match in _common_words.finditer(lowered)]
+            if matches:
+                positions, lengths = np.array(matches).T
+                owners = np.searchsorted(starts, positions, side="right") - 1
+                penalties = np.maximum(lengths * bits_per_char[owners] - WORD_BITS, 0)
+                np.subtract.at(entropy, owners, penalties)
+        else:
+            # Редкий случай: lower() изменил длину (например, "İ"), смещения не совпадут
+            for index, password in enumerate(passwords):
+                for match in _common_words.finditer(password.lower()):
+                    entropy[index] -= max(len(match.group()) * bits_per_char[index] - WORD_BITS, 0)
+        entropy = np.maximum(entropy, 0.0)
+        scores = np.searchsorted(np.array(STRENGTH_THRESHOLDS), entropy, side="right")
+        return list(zip(scores.tolist(), np.round(entropy, 1).tolist()))
+
+    @staticmethod
+    def _base_entropy(password):
+        # Энтропия без учета словаря: (длина - повторы - последовательности) * log2(алфавит) + 1 бит за каждый такой символ
+        if not password:
+            return 0.0, 0.0
+        codes = [ord(char) for char in password]
+        classes = {_CLASS_TABLE[code] if code < 128 else 4 for code in codes}
+        bits_per_char = math.log2(sum(_CLASS_SIZES[class_id] for class_id in classes))
+        predictable = sum(1 for previous, current in zip(codes, codes[1:]) if current - previous in (0, 1, -1))
+        return (len(codes) - predictable) * bits_per_char + predictable, bits_per_char
+
+    @staticmethod
+    def _base_entropies_numpy(np, passwords):
+        # То же для всей пачки сразу: символы всех паролей в одном массиве, подсчеты — bincount по номеру пароля
+        lengths = np.fromiter((len(password) for password in passwords), dtype=np.int64, count=len(passwords))
+        codes = np.frombuffer("".join(passwords).encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.int64)
+        owners = np.repeat(np.arange(len(passwords)), lengths)
+        class_table = np.array(_CLASS_TABLE, dtype=np.int64)
+        classes = np.where(codes < 128, class_table[np.minimum(codes, 127)], 4)
+        pool = np.zeros(len(passwords))
+        for class_id, size in enumerate(_CLASS_SIZES):
+            present = np.bincount(owners[classes == class_id], minlength=len(passwords)) > 0
+            pool += present * size
+        same_owner = owners[1:] == owners[:-1]
+        predictable_pairs = same_owner & (np.abs(codes[1:] - codes[:-1]) <= 1)
+        predictable = np.bincount(owners[1:][predictable_pairs], minlength=len(passwords))
+        bits_per_char = np.log2(np.maximum(pool, 1))
+        entropy = (lengths - predictable) * bits_per_char + predictable
+        return entropy.astype(np.float64), bits_per_char
+
+# Окно истории: записи расшифровываются в пуле потоков и появляются в списке по мере готовности.
+# Первой расшифровывается небольшая страница, поэтому первые строки видны сразу
+class HistoryViewer:
+    CHUNK_SIZE = 500
+    POLL_MS = 20
+
+    def __init__(self, root, vault, kind, title, workers=4):
+        from concurrent.futures import ThreadPoolExecutor
+        self.vault = vault
+        self.kind = kind
+        self.total = vault.count(kind)
+
+        self.window = ctk.CTkToplevel(root)
+        self.window.title(title)
+        self.window.geometry("420x500")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.status_label = ctk.CTkLabel(self.window, text=f"Загрузка... 0 из {self.total}", font=("Arial", 12))
+        self.status_label.pack(pady=5)
+
+        # Listbox отрисовывает только видимые строки, поэтому выдерживает сотни тысяч записей
+        list_frame = tk.Frame(self.window)
+        list_frame.pack(expand=True, fill="both", padx=5)
+        self.listbox = tk.Listbox(list_frame, font=("Arial", 12), activestyle="none")
+        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        self.listbox.pack(side="left", expand=True, fill="both")
+        scrollbar.pack(side="right", fill="y")
+
+        self.cancel_button = ctk.CTkButton(self.window, text="Отмена", command=self.cancel)
+        self.cancel_button.pack(pady=5)
+
+        self.loaded = 0
+        self._closed = False
+        self._finished = False
+        self._chunk_count = None
+        self._next_chunk = 0
+        self._ready = {}
+        self._results = queue.Queue()
+        self._cancelled = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        # Ограничиваем число страниц в работе, чтобы не читать всю базу заранее
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        threading.Thread(target=self._produce, daemon=True).start()
+        self.window.after(self.POLL_MS, self._poll)
+
+    def _produce(self):
+        # Читает страницы токенов (без расшифровки) и отдает их в пул
+        index = 0
+        last_id = None
+        limit = HISTORY_PAGE_SIZE
+        try:
+            while not self._cancelled.is_set():
+                rows = self.vault.page_tokens(self.kind, limit, after_id=last_id)
+                if not rows:
+                    break
+                self._slots.acquire()
+                if self._cancelled.is_set():
+                    self._slots.release()
+                    break
+                future = self._pool.submit(self._decrypt_chunk, rows)
+                future.add_done_callback(lambda future, index=index: self._chunk_done(index, future))
+                last_id = rows[-1][0]
+                index += 1
+                limit = self.CHUNK_SIZE
+        except RuntimeError:
+            pass  # Пул уже остановлен отменой
+        self._results.put(("end", index, None))
+
+    def _decrypt_chunk(self, rows):
+        if self._cancelled.is_set():
+            return []
+        try:
+            values = self.vault.cipher.decrypt_many([payload for _, _, payload in rows])
+        except Exception:
+            # Поврежденная запись не должна прятать остальные — расшифровываем по одной
+            values = []
+            for _, _, payload in rows:
+                try:
+                    values.append(self.vault.cipher.decrypt(payload))
+                except Exception:
+                    values.append("<не удалось расшифровать>")
+        return [f"{created}  {value}" for (_, created, _), value in zip(rows, values)]
+
+    def _chunk_done(self, index, future):
+        self._slots.release()
+        lines = [] if future.cancelled() or future.exception() else future.result()
+        self._results.put(("chunk", index, lines))
+
+    def _poll(self):
+        # Выполняется в потоке Tk: переносит готовые страницы в список строго по порядку
+        if self._closed:
+            return
+        while True:
+            try:
+                kind, index, lines = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "end":
+                self._chunk_count = index
+            else:
+                self._ready[index] = lines
+        while self._next_chunk in self._ready:
+            lines = self._ready.pop(self._next_chunk)
+            if lines:
+                self.listbox.insert(tk.END, *lines)
+                self.loaded += len(lines)
+            self._next_chunk += 1
+
+        if self._cancelled.is_set():
+            return
+        if self._chunk_count is not None and self._next_chunk >= self._chunk_count:
+            self._finish(f"Загружено {self.loaded} из {self.total}")
+            return
+        self.status_label.configure(text=f"Загрузка... {self.loaded} из {self.total}")
+        self.window.after(self.POLL_MS, self._poll)
+
+    def _finish(self, status):
+        self._finished = True
+        self.status_label.configure(text=status)
+        self.cancel_button.configure(text="Закрыть", command=self.close)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def cancel(self):
+        self._cancelled.set()
+        self._finish(f"Отменено: загружено {self.loaded} из {self.total}")
+
+    def close(self):
+        self._cancelled.set()
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.window.destroy()
 
 class PasswordGeneratorApp:
     def __init__(self, root):
@@ -51,9 +1014,65 @@ class PasswordGeneratorApp:
         self.create_password_tab()  # Создание вкладки для паролей
         self.create_email_tab()    # Создание вкладки для почт
 
-        # Генерация и загрузка ключа шифрования
-        generate_key()
-        self.key = load_key()
+        # Ключ шифрования загружается один раз (и создается при первом запуске).
+        # Ключ и хранилище истории открываются не в конструкторе, а при первом обращении,
+        # и заранее подготавливаются в фоне, когда окно уже показано
+        self.cipher = CipherManager()
+        self._history_lock = threading.Lock()
+        self._vault = None
+        self._email_index = None
+        self._appender = None
+        self.root.after(WARMUP_DELAY_MS, self.warm_up)
+
+    @property
+    def key(self):
+        return self.cipher.key
+
+    @property
+    def vault(self):
+        self._open_history()
+        return self._vault
+
+    @property
+    def email_index(self):
+        self._open_history()
+        return self._email_index
+
+    @property
+    def appender(self):
+        self._open_history()
+        return self._appender
+
+    def _open_history(self):
+        if self._appender is not None:
+            return
+        with self._history_lock:
+            if self._appender is None:
+                # Хранилище истории (с переносом прежних файлов passwords.enc/emails.enc)
+                vault = Vault(self.cipher)
+                vault.import_legacy(PASSWORD_FILE, "password")
+                vault.import_legacy(EMAIL_FILE, "email")
+                self._vault = vault
+                self._email_index = EmailIndex(self.cipher, vault)
+                # Новые записи сохраняются пачками в фоне
+                self._appender = VaultAppender(vault)
+
+    def warm_up(self):
+        # Импорт cryptography, чтение ключа и открытие хранилища — в фоновом потоке
+        def run():
+            try:
+                self.cipher.fernet
+                self._open_history()
+            except Exception as e:
+                # Ошибка повторится и будет показана при первом обращении
+                print(f"Ошибка подготовки истории: {e}", file=sys.stderr)
+        threading.Thread(target=run, name="WarmUp", daemon=True).start()
+
+    def close(self):
+        # Остаток буфера истории сохраняется, только если история открывалась
+        with self._history_lock:
+            if self._appender is not None:
+                self._appender.close()
 
     def create_password_tab(self):
         ctk.CTkLabel(self.password_frame, text="Выберите длину пароля:", font=("Arial", 12)).pack(pady=5)
@@ -67,6 +1086,16 @@ class PasswordGeneratorApp:
         )
         self.length_dropdown.pack(pady=5)
 
+        ctk.CTkLabel(self.password_frame, text="Политика пароля:", font=("Arial", 12)).pack(pady=5)
+        self.password_policy = ctk.StringVar(value="default")
+        self.policy_dropdown = ctk.CTkComboBox(
+            self.password_frame,
+            variable=self.password_policy,
+            values=list(POLICY_PRESETS),
+            state="readonly"
+        )
+        self.policy_dropdown.pack(pady=5)
+
         self.generate_password_button = ctk.CTkButton(self.password_frame, text="Сгенерировать пароль", command=self.generate_password)
         self.generate_password_button.pack(pady=5)
 
@@ -102,17 +1131,14 @@ class PasswordGeneratorApp:
 
     def generate_password(self):
         length = self.password_length.get()
-        alphabet = string.ascii_letters + string.digits + string.punctuation
-        password = ''.join(secrets.choice(alphabet) for _ in range(length))
+        password = next(get_policy(self.password_policy.get(), length).generate(1))
 
         self.password_entry.configure(state="normal")
         self.password_entry.delete(0, ctk.END)
         self.password_entry.insert(0, password)
         self.password_entry.configure(state="readonly")
 
-        encrypted_password = encrypt_data(password, self.key)
-        with open(PASSWORD_FILE, "ab") as file:
-            file.write(encrypted_password + b"\n")
+        self.appender.append("password", password)
 
     def generate_email(self):
         name = self.name_entry.get().strip()
@@ -123,40 +1149,125 @@ class PasswordGeneratorApp:
             messagebox.showerror("Ошибка", "Заполните все поля для генерации почты.")
             return
 
-        email = f"{name.lower()}.{surname.lower()}{favorite_number}@gmail.com"
+        # Если такой адрес уже выдавался, к числу добавляется суффикс
+        email = next(generate_emails([(name, surname, favorite_number)], self.email_index))
 
         self.email_entry.configure(state="normal")
         self.email_entry.delete(0, ctk.END)
         self.email_entry.insert(0, email)
         self.email_entry.configure(state="readonly")
 
-        encrypted_email = encrypt_data(email, self.key)
-        with open(EMAIL_FILE, "ab") as file:
-            file.write(encrypted_email + b"\n")
+        self.appender.append("email", email)
+        self.email_index.flush()
 
     def show_password_history(self):
-        if not os.path.exists(PASSWORD_FILE):
-            messagebox.showinfo("История паролей", "История паролей пуста.")
+        self.show_history("password", "История паролей", "История паролей пуста.")
+
+    def show_email_history(self):
+        self.show_history("email", "История почт", "История почт пуста.")
+
+    def show_history(self, kind, title, empty_message):
+        # История открывается в отдельном окне и подгружается в фоне
+        self.appender.flush()
+        if not self.vault.count(kind):
+            messagebox.showinfo(title, empty_message)
             return
+        HistoryViewer(self.root, self.vault, kind, title)
 
-        with open(PASSWORD_FILE, "rb") as file:
-            encrypted_history = file.readlines()
+# Консольный режим
+def build_parser():
+    parser = argparse.ArgumentParser(prog="genarator", description="Генератор паролей и почт. Без аргументов запускается окно приложения.")
+    commands = parser.add_subparsers(dest="command", required=True)
 
-        decrypted_history = [decrypt_data(line.strip(), self.key) for line in encrypted_history]
-        messagebox.showinfo("История паролей", "\n".join(decrypted_history) if decrypted_history else "История паролей пуста.")
+    emails = commands.add_parser("emails", help="пакетная генерация уникальных почт из CSV (name,surname[,number])")
+    emails.add_argument("csv", help="CSV-файл с именами ('-' — stdin)")
+    emails.add_argument("-o", "--output", help="куда записать адреса (по умолчанию stdout)")
 
-    def show_email_history(self):
-        if not os.path.exists(EMAIL_FILE):
-            messagebox.showinfo("История почт", "История почт пуста.")
-            return
+    strength = commands.add_parser("strength", help="оценка стойкости паролей")
+    strength.add_argument("passwords", nargs="*", help="пароли (без аргументов — по одному в строке из stdin)")
+    strength.add_argument("--vault", action="store_true", help="оценить все пароли из хранилища истории")
+    strength.add_argument("--below", type=int, default=None, help="с --vault: вывести id паролей с оценкой ниже указанной")
+
+    rotate = commands.add_parser("rotate-key", help="сменить ключ и перешифровать историю (приложение должно быть закрыто)")
+    rotate.add_argument("--chunk-size", type=int, default=1000, help="записей в пачке")
+    return parser
+
+def run_emails(args):
+    cipher = CipherManager()
+    vault = Vault(cipher)
+    try:
+        rows = read_names_csv(sys.stdin if args.csv == "-" else args.csv)
+        index = EmailIndex(cipher, vault)
+        output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        try:
+            count = 0
+            for email in generate_emails_bulk(rows, vault, index):
+                output.write(email + "\n")
+                count += 1
+        finally:
+            if args.output:
+                output.close()
+        print(f"Сгенерировано адресов: {count}", file=sys.stderr)
+    finally:
+        vault.close()
+
+def run_strength(args):
+    scorer = StrengthScorer()
+    if not args.vault:
+        passwords = args.passwords or [line.rstrip("\r\n") for line in sys.stdin]
+        # Сами пароли не выводятся: строка результата соответствует строке входа
+        for score, entropy in scorer.score_many(passwords):
+            print(f"{score}\t{entropy}\t{STRENGTH_LABELS[score]}")
+        return
+
+    cipher = CipherManager()
+    vault = Vault(cipher)
+    try:
+        start = time.perf_counter()
+        distribution = [0] * len(STRENGTH_LABELS)
+        last_id = None
+        while True:
+            rows = vault.page_tokens("password", 10000, after_id=last_id)
+            if not rows:
+                break
+            results = scorer.score_many(cipher.decrypt_many([row[2] for row in rows]))
+            for (entry_id, _, _), (score, entropy) in zip(rows, results):
+                distribution[score] += 1
+                if args.below is not None and score < args.below:
+                    print(f"{entry_id}\t{score}\t{entropy}")
+            last_id = rows[-1][0]
+        total = sum(distribution)
+        for score, count in enumerate(distribution):
+            print(f"{STRENGTH_LABELS[score]}: {count}", file=sys.stderr)
+        print(f"Оценено паролей: {total} за {time.perf_counter() - start:.2f} с", file=sys.stderr)
+    finally:
+        vault.close()
+
+def run_rotate_key(args):
+    def report(done, total):
+        print(f"\rПерешифровано: {done} из {total}", end="", file=sys.stderr, flush=True)
 
-        with open(EMAIL_FILE, "rb") as file:
-            encrypted_history = file.readlines()
+    done = KeyRotationJob(chunk_size=args.chunk_size, progress=report).run()
+    print(f"\nКлюч заменен, перешифровано записей: {done}", file=sys.stderr)
 
-        decrypted_history = [decrypt_data(line.strip(), self.key) for line in encrypted_history]
-        messagebox.showinfo("История почт", "\n".join(decrypted_history) if decrypted_history else "История почт пуста.")
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "emails":
+            run_emails(args)
+        elif args.command == "strength":
+            run_strength(args)
+        elif args.command == "rotate-key":
+            run_rotate_key(args)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     root = ctk.CTk()
     app = PasswordGeneratorApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    app.close()
\ No newline at end of file
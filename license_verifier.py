@@ -0,0 +1,116 @@
+import argparse
+import base64
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+# Проверка подписанных лицензий: нужен только открытый ключ Ed25519, без Tk и без хранилища.
+# Токен: "LK1.<данные>.<подпись>", данные — JSON записи лицензии, обе части в base64url без '='
+TOKEN_PREFIX = "LK1"
+PUBLIC_KEY_FILE = "license_verify.pem"
+# Сколько результатов проверки хранить в кэше
+CACHE_SIZE = 4096
+
+
+class InvalidLicense(ValueError):
+    """Токен поврежден, подделан или подписан другим ключом"""
+
+
+def encode_part(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def decode_part(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def signing_input(payload_part):
+    """Байты, которые подписываются: префикс и часть с данными"""
+    return f"{TOKEN_PREFIX}.{payload_part}".encode("ascii")
+
+
+class LicenseVerifier:
+    """Проверка токенов лицензий открытым ключом; результаты (и ошибки) кэшируются"""
+
+    def __init__(self, public_key=PUBLIC_KEY_FILE, cache_size=CACHE_SIZE):
+        # public_key: путь к PEM-файлу, PEM-байты или объект Ed25519PublicKey
+        if isinstance(public_key, str):
+            with open(public_key, "rb") as f:
+                public_key = f.read()
+        if isinstance(public_key, bytes):
+            public_key = serialization.load_pem_public_key(public_key)
+        if not isinstance(public_key, Ed25519PublicKey):
+            raise ValueError("Нужен открытый ключ Ed25519")
+        self.public_key = public_key
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token):
+        """Данные лицензии из токена; InvalidLicense, если подпись не сходится"""
+        with self._lock:
+            result = self._cache.get(token)
+            if result is not None:
+                self._cache.move_to_end(token)
+        if result is None:
+            result = self._verify(token)
+            with self._lock:
+                self._cache[token] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if isinstance(result, InvalidLicense):
+            # Кэшированный экземпляр не выбрасывается: иначе его __traceback__ растет с каждым вызовом
+            raise InvalidLicense(*result.args)
+        return dict(result)
+
+    def is_valid(self, token):
+        try:
+            self.verify(token)
+            return True
+        except InvalidLicense:
+            return False
+
+    def _verify(self, token):
+        # Ошибка возвращается, а не выбрасывается, чтобы попасть в кэш
+        try:
+            prefix, payload_part, signature_part = token.strip().split(".")
+        except (AttributeError, ValueError):
+            return InvalidLicense("Неверный формат токена")
+        if prefix != TOKEN_PREFIX:
+            return InvalidLicense(f"Неизвестная версия токена: {prefix}")
+        try:
+            self.public_key.verify(decode_part(signature_part), signing_input(payload_part))
+            payload = json.loads(decode_part(payload_part))
+        except InvalidSignature:
+            return InvalidLicense("Подпись не совпадает")
+        except ValueError:
+            return InvalidLicense("Неверный формат токена")
+        if not isinstance(payload, dict) or "key" not in payload:
+            return InvalidLicense("В токене нет ключа лицензии")
+        return payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="license_verifier", description="Проверка подписанных токенов лицензий.")
+    parser.add_argument("tokens", nargs="*", help="токены (без аргументов — по одному в строке из stdin)")
+    parser.add_argument("--public-key", default=PUBLIC_KEY_FILE, help=f"открытый ключ (по умолчанию {PUBLIC_KEY_FILE})")
+    args = parser.parse_args(argv)
+
+    verifier = LicenseVerifier(args.public_key)
+    status = 0
+    for token in args.tokens or (line.strip() for line in sys.stdin if line.strip()):
+        try:
+            print(f"OK\t{verifier.verify(token)['key']}")
+        except InvalidLicense as e:
+            print(f"INVALID\t{e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,38 @@
-import tkinter as tk
-from tkinter import messagebox, filedialog, simpledialog
-from cryptography.fernet import Fernet
-import pyperclip
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+import argparse
+import base64
+import hashlib
+import glob
+import io
 import json
 import os
 import platform
+import struct
+import tempfile
+import threading
+import queue
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import sys
+from datetime import datetime
+
+# Tk нужен только для графического интерфейса; консольный режим работает и без него
+try:
+    import tkinter as tk
+    from tkinter import messagebox, filedialog
+except ImportError:
+    tk = None
+
+# Блокировка файлов между процессами: историю одновременно дописывают окно и консольный режим
+if platform.system() == "Windows":
+    import msvcrt
+else:
+    import fcntl
 
 # Определяем путь к системной папке
 if platform.system() == "Windows":
@@ -12,16 +40,214 @@ if platform.system() == "Windows":
 else:
     BASE_DIR = "/var/lib/CipherApp"
 
-# Создаем папку, если она не существует
-os.makedirs(BASE_DIR, exist_ok=True)
-
 # Пути к файлам
-HISTORY_FILE = os.path.join(BASE_DIR, "history.json")
+HISTORY_FILE = os.path.join(BASE_DIR, "history.jsonl")
+HISTORY_INDEX_FILE = os.path.join(BASE_DIR, "history.idx")
+# Прежний формат истории (один JSON-массив), переносится в HISTORY_FILE при запуске
+LEGACY_HISTORY_FILE = os.path.join(BASE_DIR, "history.json")
 LICENSE_FILE = os.path.join(BASE_DIR, "license.json")
+# Файл ключей: по одному ключу в строке, первый — текущий, остальные — прежние (для расшифровки)
+KEY_FILE = os.path.join(BASE_DIR, "cipher.key")
+# Переменная окружения с путем к файлу ключей (переопределяет KEY_FILE)
+KEY_FILE_ENV = "CIPHERAPP_KEY_FILE"
+
+# Потоковый контейнер: сигнатура, затем кадры вида [длина (4 байта)][Fernet-токен]
+STREAM_MAGIC = b"CCS1"
+STREAM_CHUNK_SIZE = 1024 * 1024
+FRAME_LENGTH = struct.Struct(">I")
+# Внутри каждого токена: номер кадра и признак последнего кадра
+FRAME_HEADER = struct.Struct(">QB")
+
+# Компактный бинарный формат: [сигнатура][версия][id ключа][nonce][длина] + AES-GCM (заголовок — AAD)
+COMPACT_MAGIC = b"CB"
+COMPACT_VERSION = 1
+COMPACT_HEADER = struct.Struct(">2sB4s12sI")
+# Текстовая обертка компактного формата (base64) всегда начинается с этого префикса
+COMPACT_ARMOR_PREFIX = base64.urlsafe_b64encode(COMPACT_MAGIC + bytes([COMPACT_VERSION]))[:4].decode()
+
+# Выше этого размера текста (в символах) подстановка выполняется через NumPy, если он установлен
+NUMPY_THRESHOLD = 64 * 1024
+
+# Кэш повторяющихся фраз (по умолчанию выключен): тексты длиннее этого лимита не кэшируются
+CACHE_MAX_TEXT = 4096
+CACHE_TTL = 60.0
+
+# Индекс истории: смещение каждой записи в HISTORY_FILE (8 байт на запись)
+HISTORY_OFFSET = struct.Struct(">Q")
+# Файл блокировки истории (рядом с HISTORY_FILE)
+HISTORY_LOCK_SUFFIX = ".lock"
+HISTORY_PAGE_SIZE = 50
+
+# NumPy — необязательная зависимость, импортируется при первом обращении
+_numpy = False
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+
+def is_compact_armor(text):
+    # Текстовая обертка компактного кадра (в отличие от Fernet-токена, который начинается с "gAAAAA")
+    return isinstance(text, str) and text.lstrip().startswith(COMPACT_ARMOR_PREFIX)
+
+
+# Ограниченный LRU-кэш со сроком жизни записей; хранит открытый текст не дольше ttl секунд
+class RoundTripCache:
+    def __init__(self, maxsize=1024, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # ключ -> (срок истечения, значение), порядок LRU
+        self._expiry = deque()  # (срок истечения, ключ) в порядке добавления
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def get(self, key):
+        with self._lock:
+            self._purge_expired()
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            expires = time.monotonic() + self.ttl
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+            self._expiry.append((expires, key))
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            self._purge_expired()
+            self._schedule_purge()
+
+    def purge(self):
+        with self._lock:
+            self._timer = None
+            self._purge_expired()
+            self._schedule_purge()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._expiry.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, key = self._expiry.popleft()
+            item = self._items.get(key)
+            # Запись могла быть перезаписана позже — тогда у нее другой срок
+            if item is not None and item[0] == expires:
+                del self._items[key]
+
+    def _schedule_purge(self):
+        # Таймер удаляет истекшие записи, даже если к кэшу больше не обращаются
+        if self._timer is None and self._expiry:
+            delay = max(self._expiry[0][0] - time.monotonic(), 0) + 0.01
+            self._timer = threading.Timer(delay, self.purge)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+# Хранилище ключей Fernet с кэшем на уровне процесса
+class KeyStore:
+    # Кэш: путь к файлу -> (mtime файла, список ключей, MultiFernet)
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = os.path.abspath(path or os.getenv(KEY_FILE_ENV) or KEY_FILE)
+
+    def keys(self):
+        # Список ключей, первый — текущий
+        return self._load()[0]
+
+    def fernet(self):
+        # Готовый MultiFernet: шифрует текущим ключом, расшифровывает любым из ключей
+        return self._load()[1]
+
+    def rotate(self):
+        # Добавляет новый текущий ключ; прежние остаются для расшифровки
+        with self._lock:
+            keys = self._read_keys() if os.path.exists(self.path) else []
+            keys.insert(0, Fernet.generate_key())
+            self._write_keys(keys)
+            self._cache.pop(self.path, None)
+        return keys[0]
+
+    def rotate_token(self, token):
+        # Перешифровывает токен текущим ключом
+        return self.fernet().rotate(token)
+
+    def _load(self):
+        with self._lock:
+            if not os.path.exists(self.path):
+                self._create_keys()
+            mtime = os.stat(self.path).st_mtime_ns
+            cached = self._cache.get(self.path)
+            if cached and cached[0] == mtime:
+                return cached[1], cached[2]
+            keys = self._read_keys()
+            if not keys:
+                raise ValueError(f"Файл ключей пуст: {self.path}")
+            fernet = MultiFernet([Fernet(key) for key in keys])
+            self._cache[self.path] = (mtime, keys, fernet)
+            return keys, fernet
+
+    def _read_keys(self):
+        with open(self.path, "rb") as file:
+            return [line.strip() for line in file if line.strip()]
+
+    def _create_keys(self):
+        # Ключ при первом запуске могут создавать несколько процессов сразу. Жесткая ссылка
+        # не заменяет существующий файл: побеждает первый процесс, остальные читают его ключ
+        tmp_path = self._write_tmp([Fernet.generate_key()])
+        try:
+            os.link(tmp_path, self.path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    def _write_keys(self, keys):
+        # Атомарная запись: временный файл, затем замена
+        os.replace(self._write_tmp(keys), self.path)
+
+    def _write_tmp(self, keys):
+        # Временный файл с уникальным именем в той же папке; mkstemp дает права только для владельца
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=directory or None)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(b"\n".join(keys) + b"\n")
+                file.flush()
+                os.fsync(file.fileno())
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return tmp_path
 
 # Класс для шифрования и дешифрования
 class CustomCipher:
-    def __init__(self):
+    def __init__(self, key_store=None, backend="auto", cache_size=0, cache_ttl=CACHE_TTL):
         # Задаем алфавиты и шифрованные данные
         self.russian_alphabet = ['а', 'б', 'в', 'г', 'д', 'е', 'ё', 'ж', 'з', 'и', 'й', 'к', 'л', 'м', 'н', 'о', 'п', 'р', 'с', 'т', 'у', 'ф', 'х', 'ц', 'ч', 'ш', 'щ', 'ъ', 'ы', 'ь', 'э', 'ю', 'я']
         self.encrypted_alphabet = ['м', 'а', 'г', 'б', 'в', 'ж', 'з', 'е', 'х', 'у', 'к', 'и', 'ы', 'э', 'ё', 'ъ', 'о', 'п', 'р', 'с', 'т', 'я', 'ю', 'д', 'ц', 'ч', 'ш', 'щ', 'л', 'н', 'ф', 'ь', 'й']
@@ -34,27 +260,128 @@ class CustomCipher:
         self.encrypt_digit_dict = {original: encrypted for original, encrypted in zip(self.digits, self.encrypted_digits)}
         self.decrypt_digit_dict = {encrypted: original for original, encrypted in zip(self.digits, self.encrypted_digits)}
 
-        # Генерация ключа для дополнительного шифрования
-        self.key = Fernet.generate_key()
-        self.cipher = Fernet(self.key)
+        # Таблицы для str.translate строятся один раз и используются во всех вызовах
+        self.encrypt_table, self.encrypt_case_table = self._build_tables(self.encrypt_dict, self.encrypt_digit_dict)
+        self.decrypt_table, self.decrypt_case_table = self._build_tables(self.decrypt_dict, self.decrypt_digit_dict)
+
+        # Способ подстановки: "python" (str.translate), "numpy" или "auto" (NumPy для больших текстов)
+        self.backend = backend
+        self._numpy_tables = {}
+
+        # Необязательные кэши для повторяющихся коротких фраз (cache_size=0 — выключены):
+        # результат подстановки по открытому тексту и результат расшифровки по хешу токена
+        self.substitution_cache = RoundTripCache(cache_size, cache_ttl) if cache_size else None
+        self.decrypt_cache = RoundTripCache(cache_size, cache_ttl) if cache_size else None
+
+        # Ключ для дополнительного шифрования хранится на диске и переиспользуется между запусками
+        self.key_store = key_store or KeyStore()
+        self.key = self.key_store.keys()[0]
+        self.cipher = self.key_store.fernet()
+        # Ключи AES-GCM для компактного формата выводятся из ключей Fernet (id ключа -> AESGCM)
+        self._compact_keys = {}
+        for key in reversed(self.key_store.keys()):
+            key_id, aesgcm = self._derive_compact_key(key)
+            self._compact_keys[key_id] = aesgcm
+        self._compact_key_id = self._derive_compact_key(self.key)[0]
+
+    @staticmethod
+    def _build_tables(letter_dict, digit_dict):
+        # Первая таблица приводит заглавные буквы к строчным (как прежний посимвольный цикл),
+        # вторая сохраняет регистр
+        table = {}
+        case_table = {}
+        for original, replacement in letter_dict.items():
+            table[ord(original)] = replacement
+            case_table[ord(original)] = replacement
+            upper = original.upper()
+            if len(upper) == 1 and upper.lower() == original:
+                table[ord(upper)] = replacement
+                case_table[ord(upper)] = replacement.upper()
+        for original, replacement in digit_dict.items():
+            table[ord(original)] = replacement
+            case_table[ord(original)] = replacement
+        return table, case_table
+
+    def substitute(self, text, preserve_case=False):
+        # Кастомная подстановка (без Fernet)
+        return self._translate(text, self.encrypt_case_table if preserve_case else self.encrypt_table)
 
-    def encrypt_text(self, text):
+    def reverse_substitute(self, text, preserve_case=False):
+        # Обратная подстановка (без Fernet)
+        return self._translate(text, self.decrypt_case_table if preserve_case else self.decrypt_table)
+
+    def _translate(self, text, table):
+        if self.backend == "numpy" or (self.backend == "auto" and len(text) >= NUMPY_THRESHOLD):
+            result = self._translate_numpy(text, table)
+            if result is not None:
+                return result
+        return text.translate(table)
+
+    def _translate_numpy(self, text, table):
+        # Текст кодируется в UTF-32, и все символы заменяются одной выборкой из таблицы.
+        # Возвращает None, если NumPy недоступен или текст нельзя закодировать (одиночные суррогаты)
+        np = _load_numpy()
+        if np is None:
+            return None
+        lookup = self._numpy_tables.get(id(table))
+        if lookup is None:
+            lookup = np.arange(max(table) + 1, dtype=np.uint32)
+            for code, replacement in table.items():
+                lookup[code] = ord(replacement)
+            self._numpy_tables[id(table)] = lookup
+        try:
+            codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        except UnicodeEncodeError:
+            return None
+        size = len(lookup)
+        translated = np.where(codes < size, lookup[np.minimum(codes, size - 1)], codes)
+        return translated.tobytes().decode("utf-32-le")
+
+    def cache_stats(self):
+        # Счетчики попаданий и промахов кэшей (None, если кэш выключен)
+        if self.substitution_cache is None:
+            return None
+        return {"substitution": self.substitution_cache.stats(), "decrypt": self.decrypt_cache.stats()}
+
+    def _cached_substitute(self, text, preserve_case):
+        if self.substitution_cache is None or len(text) > CACHE_MAX_TEXT:
+            return self.substitute(text, preserve_case)
+        key = (text, preserve_case)
+        result = self.substitution_cache.get(key)
+        if result is None:
+            result = self.substitute(text, preserve_case)
+            self.substitution_cache.put(key, result)
+        return result
+
+    def _decrypt_cache_key(self, token, preserve_case):
+        if self.decrypt_cache is None or len(token) > CACHE_MAX_TEXT * 4:
+            return None
+        if isinstance(token, str):
+            token = token.strip().encode()
+        return hashlib.sha256(token).digest(), preserve_case
+
+    def encrypt_text(self, text, preserve_case=False):
         # Шифруем текст с использованием кастомного шифра
-        encrypted_text = []
-        for char in text:
-            if char.lower() in self.encrypt_dict:
-                encrypted_text.append(self.encrypt_dict[char.lower()])
-            elif char in self.encrypt_digit_dict:
-                encrypted_text.append(self.encrypt_digit_dict[char])
-            else:
-                encrypted_text.append(char)  # Оставляем символ как есть, если он не в алфавите
-        encrypted_text = ''.join(encrypted_text)
+        encrypted_text = self._cached_substitute(text, preserve_case)
 
         # Дополнительное шифрование с использованием cryptography
         encrypted_text = self.cipher.encrypt(encrypted_text.encode()).decode()
         return encrypted_text
 
-    def decrypt_text(self, encrypted_text):
+    def decrypt_text(self, encrypted_text, preserve_case=False):
+        # Принимает Fernet-токен, компактный кадр (bytes) или его текстовую обертку
+        if isinstance(encrypted_text, bytes) or is_compact_armor(encrypted_text):
+            try:
+                return self.decrypt_compact(encrypted_text, preserve_case)
+            except ValueError:
+                return "Ошибка: Неверный формат зашифрованного текста!"
+
+        cache_key = self._decrypt_cache_key(encrypted_text, preserve_case)
+        if cache_key is not None:
+            cached = self.decrypt_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # Расшифровываем текст с использованием cryptography
         try:
             decrypted_text = self.cipher.decrypt(encrypted_text.encode()).decode()
@@ -62,22 +389,357 @@ class CustomCipher:
             return "Ошибка: Неверный формат зашифрованного текста!"
 
         # Расшифровываем текст с использованием кастомного шифра
-        result = []
-        for char in decrypted_text:
-            if char.lower() in self.decrypt_dict:
-                result.append(self.decrypt_dict[char.lower()])
-            elif char in self.decrypt_digit_dict:
-                result.append(self.decrypt_digit_dict[char])
+        result = self.reverse_substitute(decrypted_text, preserve_case)
+        if cache_key is not None:
+            self.decrypt_cache.put(cache_key, result)
+        return result
+
+    @staticmethod
+    def _derive_compact_key(key):
+        key_id = hashlib.sha256(key).digest()[:4]
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"CipherApp compact v1")
+        return key_id, AESGCM(hkdf.derive(base64.urlsafe_b64decode(key)))
+
+    def encrypt_compact(self, text, preserve_case=False, armor=False):
+        # Компактный кадр: 23 байта заголовка + 16 байт тега вместо base64-токена Fernet.
+        # armor=True возвращает кадр в текстовой обертке (base64)
+        data = self._cached_substitute(text, preserve_case).encode()
+        nonce = os.urandom(12)
+        header = COMPACT_HEADER.pack(COMPACT_MAGIC, COMPACT_VERSION, self._compact_key_id, nonce, len(data) + 16)
+        frame = header + self._compact_keys[self._compact_key_id].encrypt(nonce, data, header)
+        return base64.urlsafe_b64encode(frame).decode() if armor else frame
+
+    def decrypt_compact(self, frame, preserve_case=False):
+        # Расшифровка компактного кадра (bytes или текстовая обертка); ошибки — ValueError
+        cache_key = self._decrypt_cache_key(frame, preserve_case)
+        if cache_key is not None:
+            cached = self.decrypt_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if isinstance(frame, str):
+            try:
+                frame = base64.urlsafe_b64decode(frame.strip())
+            except ValueError:
+                raise ValueError("Неверная текстовая обертка компактного кадра")
+        if len(frame) < COMPACT_HEADER.size:
+            raise ValueError("Компактный кадр слишком короткий")
+        magic, version, key_id, nonce, length = COMPACT_HEADER.unpack_from(frame)
+        if magic != COMPACT_MAGIC or version != COMPACT_VERSION:
+            raise ValueError("Неизвестный формат или версия компактного кадра")
+        if length != len(frame) - COMPACT_HEADER.size:
+            raise ValueError("Длина компактного кадра не совпадает с заголовком")
+        aesgcm = self._compact_keys.get(key_id)
+        if aesgcm is None:
+            raise ValueError("Кадр зашифрован неизвестным ключом")
+        try:
+            data = aesgcm.decrypt(nonce, frame[COMPACT_HEADER.size:], frame[:COMPACT_HEADER.size])
+        except InvalidTag:
+            raise ValueError("Компактный кадр поврежден")
+        result = self.reverse_substitute(data.decode(), preserve_case)
+        if cache_key is not None:
+            self.decrypt_cache.put(cache_key, result)
+        return result
+
+    def encrypt_stream(self, reader, writer, chunk_size=STREAM_CHUNK_SIZE, preserve_case=False):
+        # Потоковое шифрование: reader отдает текст (str), writer принимает байты.
+        # В памяти одновременно находится не больше одного кадра
+        writer.write(STREAM_MAGIC)
+        index = 0
+        total = 0
+        while True:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            self._write_frame(writer, index, False, self.substitute(chunk, preserve_case).encode())
+            index += 1
+            total += len(chunk)
+        # Завершающий пустой кадр защищает от обрезки потока
+        self._write_frame(writer, index, True, b"")
+        return total
+
+    def decrypt_stream(self, reader, writer, preserve_case=False):
+        # Потоковое дешифрование: reader отдает байты контейнера, writer принимает текст (str)
+        if reader.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+            raise ValueError("Неверный формат потока: отсутствует сигнатура")
+        expected_index = 0
+        total = 0
+        while True:
+            length_bytes = reader.read(FRAME_LENGTH.size)
+            if len(length_bytes) != FRAME_LENGTH.size:
+                raise ValueError("Поток обрезан: отсутствует завершающий кадр")
+            (length,) = FRAME_LENGTH.unpack(length_bytes)
+            token = reader.read(length)
+            if len(token) != length:
+                raise ValueError("Поток обрезан внутри кадра")
+            try:
+                payload = self.cipher.decrypt(token)
+            except InvalidToken:
+                raise ValueError(f"Кадр {expected_index} поврежден или зашифрован другим ключом")
+            index, is_last = FRAME_HEADER.unpack_from(payload)
+            if index != expected_index:
+                raise ValueError(f"Нарушен порядок кадров: ожидался {expected_index}, получен {index}")
+            # Каждый кадр содержит целые символы, поэтому декодируется независимо
+            text = payload[FRAME_HEADER.size:].decode()
+            writer.write(self.reverse_substitute(text, preserve_case))
+            total += len(text)
+            if is_last:
+                return total
+            expected_index += 1
+
+    def _write_frame(self, writer, index, is_last, data):
+        token = self.cipher.encrypt(FRAME_HEADER.pack(index, is_last) + data)
+        writer.write(FRAME_LENGTH.pack(len(token)))
+        writer.write(token)
+
+# Журнал истории: JSON Lines только на дозапись + индекс смещений
+@contextmanager
+def locked_file(file):
+    # Эксклюзивная блокировка открытого файла; ждет, пока ее снимет другой процесс
+    if platform.system() == "Windows":
+        file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass  # LK_LOCK сдается примерно через 10 секунд — ждем дальше
+        try:
+            yield
+        finally:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_FILE, index_path=HISTORY_INDEX_FILE, sync_every=16):
+        self.path = path
+        self.index_path = index_path
+        # Восстановление и дозапись выполняются под блокировкой этого файла
+        self.lock_path = path + HISTORY_LOCK_SUFFIX
+        self._lock_file = None
+        # fsync выполняется раз в sync_every записей (и при flush/close)
+        self.sync_every = sync_every
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self._data = None
+        self._index = None
+
+    def _open(self):
+        if self._data is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._lock_file is None:
+                self._lock_file = open(self.lock_path, "a+b")
+            with locked_file(self._lock_file):
+                self._recover()
+                self._data = open(self.path, "ab")
+                self._index = open(self.index_path, "ab")
+
+    def _recover(self):
+        # Приводим файлы в согласованное состояние после аварийного завершения
+        for path in (self.path, self.index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        data_size = os.path.getsize(self.path)
+        with open(self.index_path, "r+b") as index:
+            index_size = os.path.getsize(self.index_path)
+            index_size -= index_size % HISTORY_OFFSET.size
+            # Отбрасываем смещения, указывающие за конец данных
+            while index_size:
+                index.seek(index_size - HISTORY_OFFSET.size)
+                (offset,) = HISTORY_OFFSET.unpack(index.read(HISTORY_OFFSET.size))
+                if offset < data_size:
+                    break
+                index_size -= HISTORY_OFFSET.size
+            index.truncate(index_size)
+            if index_size:
+                index.seek(index_size - HISTORY_OFFSET.size)
+                (offset,) = HISTORY_OFFSET.unpack(index.read(HISTORY_OFFSET.size))
             else:
-                result.append(char)  # Оставляем символ как есть, если он не в алфавите
-        return ''.join(result)
+                offset = 0
+            # Дописываем в индекс записи, попавшие в данные, но не в индекс
+            with open(self.path, "r+b") as data:
+                data.seek(offset)
+                if index_size:
+                    line = data.readline()
+                    if not line.endswith(b"\n"):
+                        data.truncate(offset)
+                        index.truncate(index_size - HISTORY_OFFSET.size)
+                        return
+                    offset += len(line)
+                index.seek(0, os.SEEK_END)
+                while True:
+                    line = data.readline()
+                    if not line.endswith(b"\n"):
+                        # Неполная последняя строка — обрезаем
+                        data.truncate(offset)
+                        break
+                    index.write(HISTORY_OFFSET.pack(offset))
+                    offset += len(line)
+
+    def append(self, entry):
+        # O(1): одна строка в конец данных и одно смещение в конец индекса
+        line = json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            self._open()
+            # Другой процесс может дописывать те же файлы: смещение берется и обе записи
+            # сбрасываются на диск под блокировкой, иначе индекс укажет на чужую строку
+            with locked_file(self._lock_file):
+                self._data.seek(0, os.SEEK_END)
+                offset = self._data.tell()
+                self._data.write(line)
+                self._data.flush()
+                self._index.write(HISTORY_OFFSET.pack(offset))
+                self._unsynced += 1
+                if self._unsynced >= self.sync_every:
+                    self._sync()
+                else:
+                    self._index.flush()
+
+    def _sync(self):
+        for file in (self._data, self._index):
+            file.flush()
+            os.fsync(file.fileno())
+        self._unsynced = 0
+
+    def flush(self):
+        with self._lock:
+            if self._data is not None:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._data is not None:
+                self._sync()
+                self._data.close()
+                self._index.close()
+                self._data = None
+                self._index = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def count(self):
+        with self._lock:
+            self._open()
+            return os.path.getsize(self.index_path) // HISTORY_OFFSET.size
+
+    def tail(self, limit=HISTORY_PAGE_SIZE, skip=0):
+        # Последние limit записей (от старых к новым), пропуская skip самых новых.
+        # Читаются только нужные смещения и строки, а не весь файл
+        with self._lock:
+            self._open()
+            self._index.flush()
+            total = os.path.getsize(self.index_path) // HISTORY_OFFSET.size
+            end = max(total - skip, 0)
+            start = max(end - limit, 0)
+            if start == end:
+                return []
+            with open(self.index_path, "rb") as index:
+                index.seek(start * HISTORY_OFFSET.size)
+                raw = index.read((end - start) * HISTORY_OFFSET.size)
+            offsets = [offset for (offset,) in HISTORY_OFFSET.iter_unpack(raw)]
+            entries = []
+            with open(self.path, "rb") as data:
+                for offset in offsets:
+                    data.seek(offset)
+                    entries.append(json.loads(data.readline()))
+            return entries
+
+    def clear(self):
+        # Удаляет журнал; возвращает False, если история уже пуста
+        with self._lock:
+            if self._data is not None:
+                self._data.close()
+                self._index.close()
+                self._data = None
+                self._index = None
+            existed = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+            for path in (self.path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return existed
+
+    def migrate_json(self, legacy_path=LEGACY_HISTORY_FILE):
+        # Одноразовый перенос истории из прежнего history.json
+        if not os.path.exists(legacy_path):
+            return 0
+        with open(legacy_path, "r", encoding="utf-8") as file:
+            history = json.load(file)
+        for entry in history:
+            self.append(entry)
+        self.flush()
+        os.replace(legacy_path, legacy_path + ".migrated")
+        return len(history)
+
+# Фоновая запись истории: операции ставятся в очередь, файл пишет отдельный поток
+class HistoryWriter:
+    _STOP = object()
+
+    def __init__(self, store):
+        self.store = store
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="HistoryWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation, text, result, comment=None):
+        # Не блокирует вызывающий поток; время операции фиксируется сразу
+        self._queue.put({
+            "operation": operation,
+            "input_text": text,
+            "output_text": result,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "comment": comment or None,
+        })
+
+    def wait(self):
+        # Дождаться записи всех поставленных в очередь операций
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self.store.close()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is self._STOP:
+                    return
+                self.store.append(entry)
+                # Очередь опустела — сбрасываем накопленное на диск
+                if self._queue.empty():
+                    self.store.flush()
+            except Exception as e:
+                self.last_error = e
+                print(f"Ошибка записи истории: {e}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
 
 # Графический интерфейс
 class CipherApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Приложение для шифрования и дешифрования")
+
+        # Создаем папку, если она не существует
+        os.makedirs(BASE_DIR, exist_ok=True)
         self.cipher = CustomCipher()
+        # Бинарный кадр последнего шифрования; None, если в поле вывода расшифрованный текст
+        self.last_frame = None
+
+        # Журнал истории (с переносом из прежнего history.json)
+        self.history = HistoryStore()
+        self.history.migrate_json()
+        self.history_writer = HistoryWriter(self.history)
 
         # Загрузка лицензии
         self.load_license()
@@ -88,6 +750,12 @@ class CipherApp:
         self.input_text = tk.Text(root, height=5, width=50)
         self.input_text.pack()
 
+        # Необязательный комментарий к операции (без модального диалога)
+        self.comment_label = tk.Label(root, text="Комментарий к операции (необязательно):")
+        self.comment_label.pack()
+        self.comment_entry = tk.Entry(root, width=50)
+        self.comment_entry.pack()
+
         # Кнопки для шифрования и дешифрования
         self.encrypt_button = tk.Button(root, text="Зашифровать", command=self.encrypt)
         self.encrypt_button.pack()
@@ -127,36 +795,31 @@ class CipherApp:
                 json.dump(self.license_data, file)
 
     def save_history(self, operation, text, result):
-        # Сохранение операции в историю
-        history_entry = {
-            "operation": operation,
-            "input_text": text,
-            "output_text": result,
-            "timestamp": tk.simpledialog.askstring("История", "Добавьте комментарий к операции:")
-        }
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r", encoding="utf-8") as file:
-                history = json.load(file)
-        else:
-            history = []
-        history.append(history_entry)
-        with open(HISTORY_FILE, "w", encoding="utf-8") as file:
-            json.dump(history, file, ensure_ascii=False, indent=4)
+        # Сохранение операции в историю (запись выполняет фоновый поток)
+        comment = self.comment_entry.get().strip()
+        self.history_writer.submit(operation, text, result, comment)
 
     def view_history(self):
-        # Просмотр истории
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r", encoding="utf-8") as file:
-                history = json.load(file)
-            history_text = "\n".join([f"{entry['operation']}: {entry['input_text']} -> {entry['output_text']} ({entry['timestamp']})" for entry in history])
+        # Просмотр последних записей истории
+        total = self.history.count()
+        if total:
+            history = self.history.tail(HISTORY_PAGE_SIZE)
+            history_text = "\n".join([self.format_history_entry(entry) for entry in history])
+            if total > len(history):
+                history_text = f"Показаны последние {len(history)} из {total} записей\n\n" + history_text
             messagebox.showinfo("История операций", history_text)
         else:
             messagebox.showinfo("История операций", "История пуста.")
 
+    def format_history_entry(self, entry):
+        line = f"{entry['operation']}: {entry['input_text']} -> {entry['output_text']} ({entry['timestamp']})"
+        if entry.get("comment"):
+            line += f" — {entry['comment']}"
+        return line
+
     def clear_history(self):
         # Очистка истории
-        if os.path.exists(HISTORY_FILE):
-            os.remove(HISTORY_FILE)
+        if self.history.clear():
             messagebox.showinfo("Успех", "История очищена!")
         else:
             messagebox.showinfo("История операций", "История уже пуста.")
@@ -164,7 +827,8 @@ class CipherApp:
     def encrypt(self):
         text = self.input_text.get("1.0", tk.END).strip()
         if text:
-            encrypted_text = self.cipher.encrypt_text(text)
+            self.last_frame = self.cipher.encrypt_compact(text)
+            encrypted_text = base64.urlsafe_b64encode(self.last_frame).decode()
             self.output_text.config(state='normal')
             self.output_text.delete("1.0", tk.END)
             self.output_text.insert(tk.END, encrypted_text)
@@ -179,6 +843,7 @@ class CipherApp:
             decrypted_text = self.cipher.decrypt_text(text)
             # Улучшаем читаемость текста (добавляем пробелы между словами)
             decrypted_text = self.improve_readability(decrypted_text)
+            self.last_frame = None
             self.output_text.config(state='normal')
             self.output_text.delete("1.0", tk.END)
             self.output_text.insert(tk.END, decrypted_text)
@@ -194,6 +859,7 @@ class CipherApp:
     def copy_result(self):
         result = self.output_text.get("1.0", tk.END).strip()
         if result:
+            import pyperclip
             pyperclip.copy(result)
             messagebox.showinfo("Успех", "Результат скопирован в буфер обмена!")
         else:
@@ -202,6 +868,14 @@ class CipherApp:
     def save_result(self):
         result = self.output_text.get("1.0", tk.END).strip()
         if result:
+            if self.last_frame is not None:
+                # Зашифрованный результат сохраняется как бинарный кадр, без base64
+                file_path = filedialog.asksaveasfilename(defaultextension=".ccb", filetypes=[("Зашифрованные файлы", "*.ccb")])
+                if file_path:
+                    with open(file_path, "wb") as file:
+                        file.write(self.last_frame)
+                    messagebox.showinfo("Успех", f"Результат сохранен в файл: {file_path}")
+                return
             file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Текстовые файлы", "*.txt")])
             if file_path:
                 with open(file_path, "w", encoding="utf-8") as file:
@@ -210,8 +884,289 @@ class CipherApp:
         else:
             messagebox.showwarning("Ошибка", "Нет результата для сохранения!")
 
+# Консольный режим: пакетная обработка файлов и stdin/stdout без Tk
+def output_path(path, operation, output_dir=None, suffix=".enc", relative=None):
+    # relative — путь внутри обрабатываемой папки, чтобы в output_dir сохранялась структура дерева
+    name = relative or os.path.basename(path)
+    if operation == "encrypt":
+        name += suffix
+    elif name.endswith(suffix):
+        name = name[:-len(suffix)]
+    else:
+        name += ".dec"
+    if output_dir:
+        return os.path.join(output_dir, name)
+    return os.path.join(os.path.dirname(path), os.path.basename(name))
+
+
+def expand_paths(patterns, operation="encrypt", suffix=".enc"):
+    # Разворачиваем шаблоны (glob) и папки (рекурсивно); несовпавший шаблон считается ошибкой.
+    # Возвращает пары (путь, относительное имя)
+    paths = []
+    missing = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(walk_tree(pattern, operation, suffix))
+            continue
+        matches = sorted(match for match in glob.glob(pattern, recursive=True) if os.path.isfile(match))
+        if matches:
+            paths.extend((match, None) for match in matches)
+        elif os.path.isfile(pattern):
+            paths.append((pattern, None))
+        else:
+            missing.append(pattern)
+    return paths, missing
+
+
+def walk_tree(root_dir, operation="encrypt", suffix=".enc"):
+    # Файлы дерева в стабильном порядке; при дешифровании берутся только файлы с suffix
+    for directory, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if (operation == "decrypt") != filename.endswith(suffix):
+                continue
+            path = os.path.join(directory, filename)
+            yield path, os.path.relpath(path, root_dir)
+
+
+def decrypt_token(cipher, text, preserve_case=False):
+    # В отличие от decrypt_text, ошибка формата выбрасывается исключением
+    try:
+        decrypted = cipher.cipher.decrypt(text.strip().encode()).decode()
+    except InvalidToken:
+        raise ValueError("Неверный формат зашифрованного текста")
+    return cipher.reverse_substitute(decrypted, preserve_case)
+
+
+def process_file(cipher, operation, src, dst, preserve_case=False, fmt="stream"):
+    # Шифрование/дешифрование одного файла. Форматы: "stream" — потоковый контейнер
+    # (память ограничена размером кадра), "token" — Fernet-токен, "binary" — компактный кадр
+    if fmt == "stream":
+        if operation == "encrypt":
+            with open(src, "r", encoding="utf-8", newline="") as reader, open(dst, "wb") as writer:
+                cipher.encrypt_stream(reader, writer, preserve_case=preserve_case)
+        else:
+            with open(src, "rb") as reader, open(dst, "w", encoding="utf-8", newline="") as writer:
+                cipher.decrypt_stream(reader, writer, preserve_case=preserve_case)
+    elif operation == "encrypt":
+        with open(src, "r", encoding="utf-8", newline="") as file:
+            text = file.read()
+        if fmt == "binary":
+            with open(dst, "wb") as file:
+                file.write(cipher.encrypt_compact(text, preserve_case))
+        else:
+            with open(dst, "w", encoding="utf-8", newline="") as file:
+                file.write(cipher.encrypt_text(text, preserve_case))
+    else:
+        if fmt == "binary":
+            with open(src, "rb") as file:
+                result = cipher.decrypt_compact(file.read(), preserve_case)
+        else:
+            with open(src, "r", encoding="utf-8", newline="") as file:
+                result = decrypt_token(cipher, file.read(), preserve_case)
+        with open(dst, "w", encoding="utf-8", newline="") as file:
+            file.write(result)
+
+
+def process_stdio(cipher, operation, preserve_case=False, fmt="stream"):
+    stdin_text = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    stdout_text = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="")
+    if fmt == "stream":
+        if operation == "encrypt":
+            cipher.encrypt_stream(stdin_text, sys.stdout.buffer, preserve_case=preserve_case)
+        else:
+            cipher.decrypt_stream(sys.stdin.buffer, stdout_text, preserve_case=preserve_case)
+    elif fmt == "binary":
+        if operation == "encrypt":
+            sys.stdout.buffer.write(cipher.encrypt_compact(stdin_text.read(), preserve_case))
+        else:
+            stdout_text.write(cipher.decrypt_compact(sys.stdin.buffer.read(), preserve_case))
+    elif operation == "encrypt":
+        stdout_text.write(cipher.encrypt_text(stdin_text.read(), preserve_case))
+    else:
+        stdout_text.write(decrypt_token(cipher, stdin_text.read(), preserve_case))
+    stdout_text.flush()
+    sys.stdout.buffer.flush()
+
+
+# Параллельная пакетная обработка: файлы распределяются пачками по пулу процессов
+PARALLEL_BATCH_SIZE = 64
+PARALLEL_RETRIES = 2
+
+_worker_cipher = None
+
+
+def _init_worker(key_file):
+    # Каждый процесс сам читает ключ из файла — ключ не передается через каналы пула
+    global _worker_cipher
+    _worker_cipher = CustomCipher(KeyStore(key_file))
+
+
+def _process_batch(batch, operation, preserve_case, fmt, retries):
+    return [_process_with_retry(_worker_cipher, index, src, dst, operation, preserve_case, fmt, retries)
+            for index, src, dst in batch]
+
+
+def _process_with_retry(cipher, index, src, dst, operation, preserve_case, fmt, retries):
+    # Ошибки ввода-вывода повторяются до retries раз; ошибки формата не повторяются
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            directory = os.path.dirname(dst)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            process_file(cipher, operation, src, dst, preserve_case, fmt)
+            return {"index": index, "source": src, "output": dst, "status": "ok", "attempts": attempts, "error": None}
+        except OSError as e:
+            if attempts <= retries:
+                continue
+            error = e
+        except (ValueError, UnicodeDecodeError) as e:
+            error = e
+        if os.path.exists(dst):
+            os.remove(dst)
+        return {"index": index, "source": src, "output": dst, "status": "error", "attempts": attempts, "error": str(error)}
+
+
+def process_batch(jobs, operation, key_file=None, workers=None, preserve_case=False, fmt="stream",
+                  retries=PARALLEL_RETRIES, progress=None, manifest=None, batch_size=PARALLEL_BATCH_SIZE):
+    # jobs — список пар (исходный файл, файл результата).
+    # progress(done, total, result) вызывается по мере готовности файлов;
+    # manifest — текстовый файл, куда результаты пишутся JSON-строками в порядке jobs.
+    # Возвращает список результатов в порядке jobs
+    key_store = KeyStore(key_file)
+    key_store.keys()  # Ключ создается до запуска процессов, чтобы все они прочитали один и тот же
+    jobs = [(index, src, dst) for index, (src, dst) in enumerate(jobs)]
+    total = len(jobs)
+    workers = max(1, min(workers or os.cpu_count() or 1, total or 1))
+    # Мелкие пачки при малом числе файлов, чтобы нагрузка распределялась по всем процессам
+    batch_size = max(1, min(batch_size, -(-total // (workers * 4)) if total else 1))
+    batches = [jobs[start:start + batch_size] for start in range(0, total, batch_size)]
+
+    results = [None] * total
+    state = {"done": 0, "written": 0}
+
+    def collect(batch_results):
+        for result in batch_results:
+            results[result["index"]] = result
+            state["done"] += 1
+            if progress:
+                progress(state["done"], total, result)
+        # Манифест дописывается только непрерывным префиксом, поэтому порядок совпадает с jobs
+        while manifest is not None and state["written"] < total and results[state["written"]] is not None:
+            manifest.write(json.dumps(results[state["written"]], ensure_ascii=False) + "\n")
+            state["written"] += 1
+
+    if workers == 1:
+        cipher = CustomCipher(key_store)
+        for batch in batches:
+            collect([_process_with_retry(cipher, index, src, dst, operation, preserve_case, fmt, retries)
+                     for index, src, dst in batch])
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(key_store.path,)) as pool:
+            futures = [pool.submit(_process_batch, batch, operation, preserve_case, fmt, retries) for batch in batches]
+            for future in as_completed(futures):
+                collect(future.result())
+    return results
+
+
+def process_tree(src_dir, dst_dir, operation="encrypt", suffix=".enc", **kwargs):
+    # Обработка дерева папок с сохранением структуры в dst_dir
+    jobs = [(path, output_path(path, operation, dst_dir, suffix, relative))
+            for path, relative in walk_tree(src_dir, operation, suffix)]
+    return process_batch(jobs, operation, **kwargs)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="maneger",
+        description="Шифрование и дешифрование файлов без графического интерфейса. "
+                    "Без аргументов запускается окно приложения.",
+    )
+    parser.add_argument("operation", choices=["encrypt", "decrypt"], help="операция")
+    parser.add_argument("paths", nargs="*", help="файлы или шаблоны (glob); без путей или '-' — stdin/stdout")
+    parser.add_argument("-o", "--output-dir", help="папка для результатов (по умолчанию рядом с исходным файлом)")
+    parser.add_argument("--suffix", default=".enc", help="расширение зашифрованных файлов (по умолчанию .enc)")
+    parser.add_argument("--key-file", help=f"файл ключей (по умолчанию ${KEY_FILE_ENV} или {KEY_FILE})")
+    parser.add_argument("--preserve-case", action="store_true", help="сохранять регистр букв")
+    parser.add_argument("--format", choices=["stream", "token", "binary"], default="stream",
+                        help="stream — потоковый контейнер, token — Fernet-токен, binary — компактный кадр")
+    parser.add_argument("--token", dest="format", action="store_const", const="token", help="то же, что --format token")
+    parser.add_argument("--force", action="store_true", help="перезаписывать существующие файлы")
+    parser.add_argument("--history", action="store_true", help="записывать операции в историю")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="число процессов (0 — по числу ядер)")
+    parser.add_argument("--retries", type=int, default=PARALLEL_RETRIES, help="повторы при ошибках ввода-вывода")
+    parser.add_argument("--manifest", help="файл манифеста (JSON Lines в порядке входных файлов)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="не выводить список обработанных файлов")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if not args.paths or args.paths == ["-"]:
+        cipher = CustomCipher(KeyStore(args.key_file))
+        try:
+            process_stdio(cipher, args.operation, args.preserve_case, args.format)
+        except ValueError as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    paths, missing = expand_paths(args.paths, args.operation, args.suffix)
+    for pattern in missing:
+        print(f"Ошибка: файлы не найдены: {pattern}", file=sys.stderr)
+    failed = len(missing)
+
+    jobs = []
+    # Разные входные файлы могут дать одно имя результата (шаблон с -o сводит пути к имени файла);
+    # второй такой файл отклоняется и с --force, иначе один результат молча затер бы другой
+    outputs = set()
+    for src, relative in paths:
+        dst = output_path(src, args.operation, args.output_dir, args.suffix, relative)
+        if os.path.abspath(dst) in outputs:
+            print(f"Пропущен {src}: результат {dst} уже получен из другого файла", file=sys.stderr)
+            failed += 1
+            continue
+        if os.path.exists(dst) and not args.force:
+            print(f"Пропущен {src}: {dst} уже существует (используйте --force)", file=sys.stderr)
+            failed += 1
+            continue
+        outputs.add(os.path.abspath(dst))
+        jobs.append((src, dst))
+
+    def report(done, total, result):
+        if result["status"] != "ok":
+            print(f"Ошибка {result['source']}: {result['error']}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"{result['source']} -> {result['output']}")
+
+    manifest = open(args.manifest, "w", encoding="utf-8") if args.manifest else None
+    try:
+        results = process_batch(jobs, args.operation, args.key_file, args.workers or None, args.preserve_case,
+                                args.format, args.retries, report, manifest)
+    finally:
+        if manifest:
+            manifest.close()
+    failed += sum(1 for result in results if result["status"] != "ok")
+
+    if args.history:
+        history_writer = HistoryWriter(HistoryStore())
+        operation_name = "Шифрование" if args.operation == "encrypt" else "Дешифрование"
+        for result in results:
+            if result["status"] == "ok":
+                history_writer.submit(operation_name, result["source"], result["output"])
+        history_writer.close()
+    return 1 if failed else 0
+
+
 # Запуск приложения
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     root = tk.Tk()
     app = CipherApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    app.history_writer.close()
\ No newline at end of file